@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Group, Post
+from .models import Group, Post, Task
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -13,5 +13,13 @@ class PostAdmin(admin.ModelAdmin):
     list_per_page=10
 
 
+class TaskAdmin(admin.ModelAdmin):
+    """ Просмотр фоновой очереди задач в админке"""
+    list_display = ("name", "status", "attempts", "run_at", "created")
+    list_filter = ("status", "name")
+    list_per_page = 50
+
+
 admin.site.register(Post, PostAdmin)
+admin.site.register(Task, TaskAdmin)
 admin.site.register(Group)
@@ -0,0 +1,304 @@
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST, require_safe
+
+from .batch import (MAX_BATCH_ITEMS, change_follows, create_comments,
+                    create_posts)
+from .caching import conditional_response, page_etag, page_signature
+from .counters import get_user_stats
+from .models import Comment, Group, Post, User
+from .paginator import POSTS_PER_PAGE, CursorPaginator
+from .timeline import timeline_entries
+from .views import is_subscribed
+
+
+API_PAGE_LIMIT = 100
+# Компактный JSON: без пробелов и без экранирования кириллицы
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+# Поля поста в ответе: нужные для них столбцы и способ получения значения.
+# Читаются только столбцы выбранных полей
+POST_FIELDS = {
+    'id': (('id',), lambda post: post.pk),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date),
+    'updated': (('updated',), lambda post: post.updated),
+    'author': (('author__username',), lambda post: post.author.username),
+    'author_name': (
+        ('author__username', 'author__first_name', 'author__last_name'),
+        lambda post: post.author.get_full_name()
+    ),
+    'group': (
+        ('group__slug',), lambda post: post.group.slug if post.group else None
+    ),
+    'comment_count': (('comment_count',), lambda post: post.comment_count),
+    'image': (
+        ('image',), lambda post: post.image.url if post.image else None
+    ),
+    'url': (
+        ('author__username',),
+        lambda post: reverse('post', args=[post.author.username, post.pk])
+    ),
+}
+# Столбцы, без которых не работают курсор и ETag страницы
+PAGE_COLUMNS = ('id', 'pub_date', 'updated')
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API, отдаётся клиенту в виде JSON"""
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params=JSON_PARAMS
+    )
+
+
+def json_errors(view):
+    """Декоратор, отдающий ApiError клиенту в формате JSON"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'detail': error.detail}, error.status)
+    return wrapper
+
+
+def api_view(view):
+    """Декоратор представления API для чтения со сжатием gzip"""
+    return require_safe(gzip_page(json_errors(view)))
+
+
+def api_write_view(view):
+    """Декоратор изменяющего представления API: только POST
+    от вошедшего пользователя"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            raise ApiError(401, 'Нужно войти на сайт')
+        return view(request, *args, **kwargs)
+    return require_POST(gzip_page(json_errors(wrapper)))
+
+
+def parse_fields(request):
+    """Функция разбора параметра fields со списком полей поста"""
+    value = request.GET.get('fields')
+    if not value:
+        return tuple(POST_FIELDS)
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown or not fields:
+        raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}. '
+                            f'Доступны: {", ".join(POST_FIELDS)}')
+    return fields
+
+
+def parse_limit(request):
+    value = request.GET.get('limit')
+    if not value:
+        return POSTS_PER_PAGE
+    if not value.isdigit() or not 1 <= int(value) <= API_PAGE_LIMIT:
+        raise ApiError(400, f'limit должен быть от 1 до {API_PAGE_LIMIT}')
+    return int(value)
+
+
+def select_columns(queryset, fields, prefix=''):
+    """Функция ограничения запроса столбцами выбранных полей.
+    prefix задаёт путь к посту, если лента состоит не из постов"""
+    columns = set(PAGE_COLUMNS)
+    for name in fields:
+        columns.update(POST_FIELDS[name][0])
+    related = [
+        f'{prefix}{column.split("__")[0]}'
+        for column in columns if '__' in column
+    ]
+    if prefix:
+        related.append(prefix.rstrip('_'))
+    # select_related() без аргументов присоединил бы все связи
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefix:
+        # Курсор ленты подписок идёт по дате записи ленты
+        return queryset.only(
+            'pub_date', *[f'{prefix}{column}' for column in columns]
+        )
+    return queryset.only(*columns)
+
+
+def serialize_posts(posts, fields):
+    """Функция построения словарей постов без сериализаторов и форм"""
+    getters = [(name, POST_FIELDS[name][1]) for name in fields]
+    return [{name: get(post) for name, get in getters} for post in posts]
+
+
+def serialize_author(request, author):
+    stats = get_user_stats(author)
+    return {
+        'username': author.username,
+        'name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': bool(is_subscribed(request.user, author)),
+    }
+
+
+def post_page(request, queryset, extra=None, versions=(), prefix=''):
+    """Функция ответа страницей ленты с курсорной пагинацией.
+    Поля, размер страницы и versions входят в ETag"""
+    fields = parse_fields(request)
+    limit = parse_limit(request)
+    paginator = CursorPaginator(
+        select_columns(queryset, fields, prefix), limit,
+        item_attr=prefix.rstrip('_') or None
+    )
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    etag = page_etag(
+        request, page_signature(page), page.has_next(), page.has_previous(),
+        ','.join(fields), limit, *versions
+    )
+    return conditional_response(request, etag, lambda: (
+        json_response({
+            **(extra or {}),
+            'results': serialize_posts(page, fields),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+    ))
+
+
+@api_view
+def index(request):
+    """Функция вывода ленты всех постов"""
+    return post_page(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    """Функция вывода ленты сообщества"""
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        raise ApiError(404, 'Сообщество не найдено')
+    return post_page(
+        # Не через group.posts: менеджер связи читает отложенный group_id
+        request, Post.objects.filter(group=group),
+        extra={'group': {
+            'slug': group.slug, 'title': group.title,
+            'description': group.description,
+        }},
+        versions=(group.title, group.description)
+    )
+
+
+@api_view
+def profile(request, username):
+    """Функция вывода ленты автора со счётчиками"""
+    author = User.objects.select_related('stats').filter(
+        username=username
+    ).first()
+    if author is None:
+        raise ApiError(404, 'Автор не найден')
+    data = serialize_author(request, author)
+    return post_page(
+        request, Post.objects.filter(author=author), extra={'author': data},
+        versions=data.values()
+    )
+
+
+@api_view
+def follow_index(request):
+    """Функция вывода ленты подписок"""
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужно войти на сайт')
+    return post_page(
+        request, timeline_entries(request.user), prefix='post__'
+    )
+
+
+@api_view
+def post_view(request, username, post_id):
+    """Функция вывода поста с комментариями"""
+    post = Post.objects.select_related('author__stats', 'group').filter(
+        author__username=username, id=post_id
+    ).first()
+    if post is None:
+        raise ApiError(404, 'Пост не найден')
+    fields = parse_fields(request)
+    author = serialize_author(request, post.author)
+    etag = page_etag(
+        request, post.pk, post.updated.timestamp(), ','.join(fields),
+        *author.values()
+    )
+
+    def make_response():
+        comments = Comment.objects.filter(post_id=post.pk).select_related(
+            'author'
+        ).only(
+            'id', 'text', 'created', 'author__username',
+            'author__first_name', 'author__last_name'
+        )
+        return json_response({
+            'post': serialize_posts([post], fields)[0],
+            'author': author,
+            'comments': [
+                {
+                    'id': comment.pk, 'author': comment.author.username,
+                    'author_name': comment.author.get_full_name(),
+                    'text': comment.text, 'created': comment.created,
+                }
+                for comment in comments
+            ],
+        })
+
+    return conditional_response(request, etag, make_response)
+
+
+BATCH_SECTIONS = ('posts', 'comments', 'follow', 'unfollow')
+
+
+@api_write_view
+def batch(request):
+    """Функция пакетного создания постов и комментариев и изменения
+    подписок. Всё сохраняется в одной транзакции, для каждого
+    элемента возвращается свой результат в том же порядке"""
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        raise ApiError(400, 'Тело запроса должно быть JSON')
+    if not isinstance(payload, dict):
+        raise ApiError(400, 'Ожидается объект с разделами '
+                            f'{", ".join(BATCH_SECTIONS)}')
+    sections = {name: payload.get(name, []) for name in BATCH_SECTIONS}
+    for name, items in sections.items():
+        if not isinstance(items, list):
+            raise ApiError(400, f'Раздел {name} должен быть списком')
+    total = sum(len(items) for items in sections.values())
+    if total > MAX_BATCH_ITEMS:
+        raise ApiError(
+            400, f'В одном запросе не больше {MAX_BATCH_ITEMS} элементов'
+        )
+    with transaction.atomic():
+        follow, unfollow = change_follows(
+            request.user, sections['follow'], sections['unfollow']
+        )
+        results = {
+            'posts': create_posts(request.user, sections['posts']),
+            'comments': create_comments(request.user, sections['comments']),
+            'follow': follow,
+            'unfollow': unfollow,
+        }
+    return json_response(results)
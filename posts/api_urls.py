@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import api
+
+
+urlpatterns = [
+    path("posts/", api.index, name="api_index"),
+    path("groups/<slug>/posts/", api.group_posts, name="api_group_posts"),
+    path("follow/", api.follow_index, name="api_follow_index"),
+    path("batch/", api.batch, name="api_batch"),
+    path("users/<str:username>/posts/", api.profile, name="api_profile"),
+    path(
+        "users/<str:username>/posts/<int:post_id>/",
+        api.post_view,
+        name="api_post"
+    ),
+]
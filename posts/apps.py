@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from yatube.db import connect_signals
+
+        from . import signals  # noqa: F401
+        connect_signals()
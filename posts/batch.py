@@ -0,0 +1,175 @@
+from django.urls import reverse
+from django.utils import timezone
+
+from .counters import change_user_stats, get_user_stats, recount_comments
+from .follows import follow_authors, unfollow_authors
+from .forms import BatchPostForm, CommentForm
+from .models import Comment, Group, Post, User
+from .search import index_posts
+from .tasks import enqueue
+from .timeline import INLINE_FANOUT_LIMIT, fan_out_posts
+
+
+# Сколько объектов и изменений подписок можно передать в одном запросе
+MAX_BATCH_ITEMS = 500
+
+
+def invalid(errors):
+    return {'status': 'invalid', 'errors': errors}
+
+
+def form_errors(form):
+    return {field: list(errors) for field, errors in form.errors.items()}
+
+
+def fill_ids(model, objects, **owner):
+    """Функция получения ключей объектов после bulk_create.
+    PostgreSQL возвращает их сам, а SQLite — нет. Внутри транзакции
+    SQLite держит блокировку записи, поэтому последние записи
+    владельца — это только что созданные объекты, по порядку"""
+    if not objects or objects[0].pk is not None:
+        return
+    ids = model.objects.filter(**owner).order_by('-pk').values_list(
+        'pk', flat=True
+    )[:len(objects)]
+    for obj, pk in zip(objects, reversed(list(ids))):
+        obj.pk = pk
+
+
+def build_results(results):
+    """Функция замены созданных объектов их описанием в ответе"""
+    return [
+        item if isinstance(item, dict) else {
+            'status': 'created', 'id': item.pk, **(
+                {'url': reverse(
+                    'post', args=[item.author.username, item.pk]
+                )} if isinstance(item, Post) else {}
+            )
+        }
+        for item in results
+    ]
+
+
+def create_posts(author, items):
+    """Функция создания постов одним bulk_create.
+    Текст проверяется правилами PostForm, сообщества ищутся одним
+    запросом. Счётчики, ленты подписчиков и поисковый индекс
+    обновляются для всего пакета сразу, а не сигналами на каждый пост"""
+    slugs = {
+        item.get('group') for item in items
+        if isinstance(item, dict) and isinstance(item.get('group'), str)
+    }
+    groups = dict(
+        Group.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+    ) if slugs else {}
+    results, posts = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append(invalid({'__all__': ['Ожидается объект']}))
+            continue
+        form = BatchPostForm(data={'text': item.get('text', '')})
+        errors = form_errors(form)
+        group = item.get('group')
+        if group is not None and (
+            not isinstance(group, str) or group not in groups
+        ):
+            errors['group'] = ['Сообщество не найдено']
+        if errors:
+            results.append(invalid(errors))
+            continue
+        post = form.save(commit=False)
+        post.author = author
+        post.group_id = groups.get(group)
+        posts.append(post)
+        results.append(post)
+    if posts:
+        Post.objects.bulk_create(posts)
+        fill_ids(Post, posts, author=author)
+        change_user_stats(author.pk, posts_count=len(posts))
+        if get_user_stats(author).followers_count <= INLINE_FANOUT_LIMIT:
+            fan_out_posts(author, posts)
+        else:
+            for post in posts:
+                enqueue('fan_out_post', post.pk)
+        index_posts([post.pk for post in posts])
+        enqueue('warm_index_cache', unique=True)
+    return build_results(results)
+
+
+def create_comments(author, items):
+    """Функция создания комментариев одним bulk_create.
+    Текст проверяется правилами CommentForm, посты ищутся одним
+    запросом, счётчики комментариев пересчитываются для каждого
+    затронутого поста одним запросом на весь пакет"""
+    requested = {
+        item.get('post') for item in items
+        if isinstance(item, dict) and isinstance(item.get('post'), int)
+    }
+    post_ids = set(Post.objects.filter(
+        pk__in=requested
+    ).values_list('pk', flat=True)) if requested else set()
+    results, comments = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append(invalid({'__all__': ['Ожидается объект']}))
+            continue
+        form = CommentForm(data={'text': item.get('text', '')})
+        errors = form_errors(form)
+        post_id = item.get('post')
+        if not isinstance(post_id, int) or post_id not in post_ids:
+            errors['post'] = ['Пост не найден']
+        if errors:
+            results.append(invalid(errors))
+            continue
+        comment = form.save(commit=False)
+        comment.author = author
+        comment.post_id = post_id
+        comments.append(comment)
+        results.append(comment)
+    if comments:
+        Comment.objects.bulk_create(comments)
+        fill_ids(Comment, comments, author=author)
+        changed = {comment.post_id for comment in comments}
+        recount_comments(changed, updated=timezone.now())
+        index_posts(changed)
+    return build_results(results)
+
+
+def change_follows(user, follow, unfollow):
+    """Функция подписки на авторов и отписки от них.
+    Авторы ищутся одним запросом для проверки имён, подписки
+    создаются и удаляются одним запросом на раздел, а статус
+    каждого элемента зависит от того, что этот запрос изменил"""
+    names = {name for name in follow + unfollow if isinstance(name, str)}
+    authors = dict(
+        User.objects.filter(username__in=names).values_list('username', 'pk')
+    ) if names else {}
+
+    def check(name):
+        if not isinstance(name, str):
+            return invalid({'author': ['Ожидается имя пользователя']})
+        if authors.get(name) is None:
+            return {'status': 'not_found'}
+        if authors[name] == user.pk:
+            return invalid({'author': ['Нельзя подписаться на себя']})
+        return None
+
+    def apply(items, change, status):
+        checked = [check(name) for name in items]
+        changed = set(change(user.pk, [
+            name for name, result in zip(items, checked) if result is None
+        ]))
+        results = []
+        for name, result in zip(items, checked):
+            if result is None:
+                # Повтор имени в разделе ничего не меняет
+                result = {'status': status if authors[name] in changed
+                          else 'unchanged'}
+                changed.discard(authors[name])
+            results.append(result)
+        return results
+
+    return (
+        apply(follow, follow_authors, 'followed'),
+        apply(unfollow, unfollow_authors, 'unfollowed'),
+    )
@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .counters import recount_comments, recount_user_stats
+from .models import Follow, Post, TimelineEntry, UserStats
+from .search import index_posts
+from .timeline import BACKFILL_SIZE, BATCH_SIZE, FANOUT_LIMIT, timeline_entry
+
+
+User = get_user_model()
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Контекстный менеджер, отключающий auto_now и auto_now_add.
+    Иначе bulk_create заменяет заданные даты текущим временем"""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunked(iterable, size):
+    """Функция разбиения последовательности на списки по size элементов"""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def rebuild_derived():
+    """Функция пересборки данных, которые при обычной работе
+    поддерживают сигналы: счётчиков, лент подписок и поискового индекса.
+    Нужна после bulk_create, который сигналы не вызывает"""
+    recount_comments()
+    missing = list(
+        User.objects.filter(stats=None).values_list('pk', flat=True)
+    )
+    for chunk in chunked(missing, BATCH_SIZE):
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in chunk],
+            ignore_conflicts=True
+        )
+    recount_user_stats()
+    authors = list(UserStats.objects.filter(
+        followers_count__gt=0, followers_count__lte=FANOUT_LIMIT
+    ).values_list('user_id', flat=True))
+    for author_id in authors:
+        follower_ids = list(Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True))
+        posts = list(Post.objects.filter(author_id=author_id).only(
+            'pk', 'author_id', 'pub_date'
+        )[:BACKFILL_SIZE])
+        entries = (
+            timeline_entry(user_id, post)
+            for post in posts for user_id in follower_ids
+        )
+        for chunk in chunked(entries, BATCH_SIZE):
+            TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    for chunk in chunked(post_ids, BATCH_SIZE):
+        with transaction.atomic():
+            index_posts(chunk)
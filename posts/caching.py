@@ -0,0 +1,51 @@
+import hashlib
+
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+# Фрагменты лент привязаны к версиям постов, поэтому их можно
+# хранить долго: любое изменение поста меняет ключ кэша
+FEED_CACHE_TTL = 60 * 60 * 6
+
+
+def page_signature(page):
+    """Функция вычисления версии страницы ленты
+    по составу постов и времени их последнего изменения"""
+    stamps = ','.join(
+        f'{post.pk}:{post.updated.timestamp()}' for post in page
+    )
+    return hashlib.md5(stamps.encode()).hexdigest()
+
+
+def page_etag(request, *versions):
+    """Функция построения ETag страницы из версий показанных данных.
+    Пользователь входит в ETag, потому что страница для него своя"""
+    parts = [str(request.user.pk or '')]
+    parts.extend(str(version) for version in versions)
+    return quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def conditional_response(request, etag, make_response):
+    """Функция ответа на условный запрос.
+    Если версия у клиента актуальна, возвращается 304, а make_response
+    не вызывается, поэтому ответ не строится. Last-Modified не
+    отправляется: время изменения показанных постов не учитывает
+    счётчики, подписки и удалённые посты, которые покрывает ETag"""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = make_response()
+    if request.method in ('GET', 'HEAD'):
+        response.setdefault('ETag', etag)
+    # Браузер хранит страницу, но перед показом сверяет её с сервером
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def render_conditional(request, template_name, context, etag):
+    """Функция вывода страницы с учётом условного запроса.
+    Если версия у клиента актуальна, возвращается 304 без отрисовки шаблона"""
+    return conditional_response(
+        request, etag, lambda: render(request, template_name, context)
+    )
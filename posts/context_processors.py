@@ -0,0 +1,6 @@
+from .caching import FEED_CACHE_TTL
+
+
+def feed_cache(request):
+    """Функция передачи в шаблоны времени хранения фрагментов лент"""
+    return {"cache_ttl": FEED_CACHE_TTL}
@@ -0,0 +1,78 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+
+def _count_subquery(queryset, field):
+    """Функция построения подзапроса с количеством связанных записей"""
+    counts = queryset.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount_comments(post_ids=None, **changes):
+    """Функция пересчёта счётчиков комментариев постов post_ids
+    или всех постов. changes обновляются вместе со счётчиком.
+    Возвращает количество обновлённых постов"""
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    return posts.update(
+        comment_count=_count_subquery(Comment.objects, 'post'), **changes
+    )
+
+
+def count_user_stats(user_id):
+    """Функция подсчёта счётчиков пользователя по исходным таблицам"""
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def get_user_stats(user):
+    """Функция получения счётчиков пользователя.
+    Запись создаётся при первом обращении"""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.pk, defaults=count_user_stats(user.pk)
+        )
+        return stats
+
+
+def change_user_stats(user_id, **deltas):
+    """Функция изменения счётчиков пользователя на заданные величины.
+    Ещё не созданная запись не трогается: она будет посчитана
+    при первом чтении"""
+    if user_id is None:
+        return
+    change_users_stats([user_id], **deltas)
+
+
+def change_users_stats(user_ids, **deltas):
+    """Функция изменения счётчиков нескольких пользователей
+    на одинаковые величины одним запросом"""
+    if not user_ids:
+        return
+    queryset = UserStats.objects.filter(user_id__in=user_ids)
+    changes = {}
+    for field, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        changes[field] = F(field) + delta
+    queryset.update(**changes)
+
+
+def recount_user_stats():
+    """Функция пересчёта всех созданных счётчиков пользователей.
+    Возвращает количество обновлённых записей"""
+    return UserStats.objects.update(
+        posts_count=_count_subquery(Post.objects, 'author'),
+        followers_count=_count_subquery(Follow.objects, 'author'),
+        following_count=_count_subquery(Follow.objects, 'user'),
+    )
@@ -0,0 +1,116 @@
+from sqlite3 import sqlite_version_info
+
+from django.db import connection, transaction
+
+from .counters import change_user_stats, change_users_stats
+from .models import Follow, User
+from .timeline import backfill_timeline, trim_timeline
+
+
+def supports_returning():
+    """Функция проверки поддержки RETURNING в INSERT и DELETE.
+    В SQLite она появилась в версии 3.35"""
+    if connection.vendor == 'sqlite':
+        return sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def table_names():
+    """Функция получения экранированных имён таблиц и столбцов"""
+    quote = connection.ops.quote_name
+    return {
+        'follow': quote(Follow._meta.db_table),
+        'user_id': quote(Follow._meta.get_field('user').column),
+        'author_id': quote(Follow._meta.get_field('author').column),
+        'users': quote(User._meta.db_table),
+        'id': quote(User._meta.pk.column),
+        'username': quote(User._meta.get_field('username').column),
+    }
+
+
+def insert_sql(count):
+    """Запрос добавления подписок с пропуском существующих.
+    Автор ищется подзапросом по имени, поэтому несуществующее имя
+    и подписка на себя ничего не вставляют"""
+    ops = connection.ops
+    return (
+        '{insert} {follow} ({user_id}, {author_id}) '
+        'SELECT %s, {id} FROM {users} '
+        'WHERE {username} IN ({placeholders}) AND {id} <> %s {suffix}'
+    ).format(
+        insert=ops.insert_statement(ignore_conflicts=True),
+        suffix=ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        placeholders=', '.join(['%s'] * count), **table_names()
+    )
+
+
+def delete_sql(count):
+    """Запрос удаления подписок на авторов с заданными именами"""
+    return (
+        'DELETE FROM {follow} WHERE {user_id} = %s AND {author_id} IN '
+        '(SELECT {id} FROM {users} WHERE {username} IN ({placeholders}))'
+    ).format(placeholders=', '.join(['%s'] * count), **table_names())
+
+
+def execute_changes(make_sql, make_params, usernames):
+    """Функция выполнения изменения подписок одним запросом.
+    Возвращает ключи авторов, подписки на которых этот запрос
+    действительно создал или удалил"""
+    with connection.cursor() as cursor:
+        if supports_returning():
+            cursor.execute(
+                f'{make_sql(len(usernames))} '
+                f'RETURNING {table_names()["author_id"]}',
+                make_params(usernames)
+            )
+            return [author_id for author_id, in cursor.fetchall()]
+        # Без RETURNING запрос выполняется для каждого имени отдельно,
+        # а число изменённых строк показывает, что подписка изменилась
+        changed = []
+        for name in usernames:
+            cursor.execute(make_sql(1), make_params([name]))
+            if cursor.rowcount:
+                changed.append(name)
+    return list(User.objects.filter(
+        username__in=changed
+    ).values_list('pk', flat=True)) if changed else []
+
+
+def follow_authors(user_id, usernames):
+    """Функция подписки на авторов.
+    Повторная подписка ничего не меняет, поэтому одновременные
+    запросы на одну пару не создают дубликатов и не сбивают счётчики:
+    счётчики и лента меняются только для реально созданных подписок.
+    Возвращает ключи авторов, на которых пользователь подписался"""
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return []
+    with transaction.atomic():
+        author_ids = execute_changes(
+            insert_sql, lambda names: [user_id, *names, user_id], usernames
+        )
+        if author_ids:
+            change_users_stats(author_ids, followers_count=1)
+            change_user_stats(user_id, following_count=len(author_ids))
+            for author_id in author_ids:
+                backfill_timeline(user_id, User(pk=author_id))
+    return author_ids
+
+
+def unfollow_authors(user_id, usernames):
+    """Функция отписки от авторов.
+    Удаление уже удалённой подписки ничего не меняет.
+    Возвращает ключи авторов, от которых пользователь отписался"""
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return []
+    with transaction.atomic():
+        author_ids = execute_changes(
+            delete_sql, lambda names: [user_id, *names], usernames
+        )
+        if author_ids:
+            change_users_stats(author_ids, followers_count=-1)
+            change_user_stats(user_id, following_count=-len(author_ids))
+            for author_id in author_ids:
+                trim_timeline(user_id, author_id)
+    return author_ids
@@ -1,6 +1,9 @@
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from .models import Comment, Post
+from .uploads import RejectedUpload, store_image
 
 
 class PostForm(ModelForm):
@@ -9,6 +12,32 @@ class PostForm(ModelForm):
         model = Post
         fields = ['group', 'text', 'image']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Отклонённая при приёме загрузка убирается из файлов формы,
+        # чтобы вместо ошибки пустого файла показать причину отказа
+        self.upload_error = None
+        image = self.files.get('image')
+        if isinstance(image, RejectedUpload):
+            self.files = self.files.copy()
+            del self.files['image']
+            self.upload_error = image.error
+
+    def clean_image(self):
+        if self.upload_error:
+            raise ValidationError(self.upload_error)
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return store_image(image, Post._meta.get_field('image'))
+        return image
+
+
+class BatchPostForm(PostForm):
+    """Форма поста из пакетного запроса: правила те же, что у PostForm,
+    но без изображения, а сообщество находится сразу для всего пакета"""
+    class Meta(PostForm.Meta):
+        fields = ['text']
+
 
 class CommentForm(ModelForm):
     """Форма добавления комментария"""
@@ -0,0 +1,192 @@
+import json
+import math
+import re
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from yatube.metrics import collect_metrics
+
+
+User = get_user_model()
+
+# Ссылка на следующую страницу ленты с курсорной пагинацией
+NEXT_CURSOR = re.compile(r'href="\?cursor=([^"]+)">Следующая')
+# Показатели сравниваются с сохранёнными, допуск задаётся в долях
+COMPARED = ('p50', 'p99', 'queries', 'bytes')
+# Параметры, при которых замеры сопоставимы между собой
+CONDITIONS = ('pages', 'no_cache')
+
+
+def percentile(values, fraction):
+    """Функция вычисления перцентиля методом ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def bench_targets():
+    """Адреса для замера на самых нагруженных данных: крупнейшая группа,
+    самый пишущий автор, самый обсуждаемый пост и лента подписок
+    пользователя с наибольшим числом подписок"""
+    targets = {'index': (reverse('index'), None)}
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    if group is not None:
+        targets['group_posts'] = (
+            reverse('group_posts', args=[group.slug]), None
+        )
+    post = Post.objects.select_related('author').order_by(
+        '-comment_count', '-pk'
+    ).first()
+    if post is not None:
+        author = Post.objects.values('author__username').annotate(
+            total=Count('pk')
+        ).order_by('-total').first()['author__username']
+        targets['profile'] = (reverse('profile', args=[author]), None)
+        targets['post'] = (
+            reverse('post', args=[post.author.username, post.pk]), None
+        )
+    reader = Follow.objects.values('user').annotate(
+        total=Count('pk')
+    ).order_by('-total').first()
+    if reader is not None:
+        targets['follow_index'] = (reverse('follow_index'), reader['user'])
+    return targets
+
+
+def compare(results, baseline, tolerance):
+    """Функция поиска показателей, ухудшившихся сильнее допуска.
+    Число запросов к базе не должно расти вовсе"""
+    regressions = []
+    for view, stats in results.items():
+        saved = baseline.get(view)
+        if saved is None:
+            continue
+        for field in COMPARED:
+            allowed = saved[field] if field == 'queries' else (
+                saved[field] * (1 + tolerance)
+            )
+            if stats[field] > allowed:
+                regressions.append(
+                    f'{view}: {field} {stats[field]} при базовом '
+                    f'{saved[field]}'
+                )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет ленты на текущих данных: задержку p50 и p99, '
+        'число SQL-запросов и размер ответа. Результат можно сохранить '
+        'как базовый и сравнивать с ним следующие замеры'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Количество запросов к каждому представлению'
+        )
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько страниц ленты пролистывать по курсору'
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--save-baseline', metavar='PATH',
+            help='Сохранить результат в файл как базовый'
+        )
+        parser.add_argument(
+            '--baseline', metavar='PATH',
+            help='Сравнить результат с сохранённым и завершиться ошибкой '
+                 'при ухудшении'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимое ухудшение задержки и размера ответа в долях'
+        )
+
+    def measure(self, client, path, options):
+        """Запрашивает страницы ленты, переходя по курсору,
+        и возвращает время, запросы и размер каждого ответа"""
+        samples = []
+        for _ in range(options['requests']):
+            url = path
+            for _ in range(options['pages']):
+                if options['no_cache']:
+                    cache.clear()
+                started = time.perf_counter()
+                with collect_metrics() as metrics:
+                    response = client.get(url)
+                elapsed = time.perf_counter() - started
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'{url} ответил {response.status_code}'
+                    )
+                content = response.content.decode()
+                samples.append((elapsed, metrics.queries, len(content)))
+                cursor = NEXT_CURSOR.search(content)
+                if cursor is None:
+                    break
+                url = f'{path}?cursor={cursor.group(1)}'
+        return {
+            'p50': round(percentile([s[0] for s in samples], 0.5) * 1000, 2),
+            'p99': round(percentile([s[0] for s in samples], 0.99) * 1000, 2),
+            'queries': max(s[1] for s in samples),
+            'bytes': round(statistics.mean(s[2] for s in samples)),
+        }
+
+    def handle(self, *args, **options):
+        conditions = {name: options[name] for name in CONDITIONS}
+        results = {}
+        for view, (path, user_id) in bench_targets().items():
+            # Адрес не из INTERNAL_IPS, чтобы не включалась панель отладки
+            client = Client(REMOTE_ADDR='192.0.2.1')
+            if user_id is not None:
+                client.force_login(User.objects.get(pk=user_id))
+            results[view] = self.measure(client, path, options)
+        self.stdout.write(
+            f'{"представление":<14}{"p50, мс":>10}{"p99, мс":>10}'
+            f'{"SQL":>6}{"байт":>10}'
+        )
+        for view, stats in results.items():
+            self.stdout.write(
+                f'{view:<14}{stats["p50"]:>10.2f}{stats["p99"]:>10.2f}'
+                f'{stats["queries"]:>6}{stats["bytes"]:>10}'
+            )
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump(
+                    {'conditions': conditions, 'views': results},
+                    baseline_file, indent=2, sort_keys=True
+                )
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline['conditions'] != conditions:
+                raise CommandError(
+                    f'Базовый замер сделан с другими параметрами: '
+                    f'{baseline["conditions"]}'
+                )
+            regressions = compare(
+                results, baseline['views'], options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Ухудшение относительно базового замера:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS(
+                'Ухудшений относительно базового замера нет'
+            ))
@@ -0,0 +1,131 @@
+import asyncio
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.handlers import ASGIHandler, build_environ
+
+
+def feed_paths():
+    """Адреса лент для замера: главная, сообщество, профиль и пост"""
+    paths = [reverse('index')]
+    post = Post.objects.select_related('author', 'group').first()
+    if post is not None:
+        username = post.author.username
+        paths.append(reverse('profile', args=[username]))
+        paths.append(reverse('post', args=[username, post.pk]))
+        if post.group is not None:
+            paths.append(reverse('group_posts', args=[post.group.slug]))
+    return paths
+
+
+def http_scope(path):
+    return {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 80),
+        # Адрес не из INTERNAL_IPS, чтобы не включалась панель отладки
+        'client': ('192.0.2.1', 0), 'scheme': 'http', 'http_version': '1.1',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает обслуживание медленных клиентов лентами: '
+        'WSGI с потоком на запрос и ASGI с тем же числом потоков для Django'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, default=200,
+            help='Количество клиентов, пришедших одновременно'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Количество потоков, выполняющих Django'
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=0.5,
+            help='Время в секундах, которое медленный клиент '
+                 'тратит на отправку запроса и приём ответа'
+        )
+
+    def bench_wsgi(self, handler, paths, options):
+        """Поток занят запросом всё время, пока клиент передаёт данные"""
+        delay = options['client_delay'] / 2
+        started = time.perf_counter()
+
+        def serve(number):
+            time.sleep(delay)
+            environ = build_environ(
+                http_scope(paths[number % len(paths)]), BytesIO()
+            )
+            status = handler.run_wsgi(environ)[0]
+            time.sleep(delay)
+            return status, time.perf_counter() - started
+
+        with handler.executor as pool:
+            return list(pool.map(serve, range(options['clients'])))
+
+    def bench_asgi(self, handler, paths, options):
+        """Передача данных клиенту ждёт в цикле событий, не занимая поток.
+        Время ответа считается от общего старта, как и в WSGI"""
+        delay = options['client_delay'] / 2
+
+        started = time.perf_counter()
+
+        async def serve(number):
+            response = {}
+
+            async def receive():
+                await asyncio.sleep(delay)
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    response['status'] = message['status']
+                else:
+                    await asyncio.sleep(delay)
+
+            await handler(
+                http_scope(paths[number % len(paths)]), receive, send
+            )
+            return response['status'], time.perf_counter() - started
+
+        async def main():
+            return await asyncio.gather(*(
+                serve(number) for number in range(options['clients'])
+            ))
+
+        try:
+            return asyncio.run(main())
+        finally:
+            handler.executor.shutdown(wait=True)
+
+    def handle(self, *args, **options):
+        paths = feed_paths()
+        wsgi_application = get_wsgi_application()
+        modes = {'WSGI': self.bench_wsgi, 'ASGI': self.bench_asgi}
+        self.stdout.write(f'Адреса: {", ".join(paths)}')
+        self.stdout.write(
+            f'{"режим":<8}{"потоков":>10}{"запросов/с":>12}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"ошибок":>8}'
+        )
+        for title, bench in modes.items():
+            handler = ASGIHandler(wsgi_application, options['workers'])
+            started = time.perf_counter()
+            results = bench(handler, paths, options)
+            elapsed = time.perf_counter() - started
+            latencies = sorted(latency for _, latency in results)
+            errors = sum(1 for status, _ in results if status >= 500)
+            self.stdout.write(
+                f'{title:<8}{options["workers"]:>10}'
+                f'{len(results) / elapsed:>12.0f}'
+                f'{statistics.median(latencies) * 1000:>10.0f}'
+                f'{latencies[int(len(latencies) * 0.95) - 1] * 1000:>10.0f}'
+                f'{errors:>8}'
+            )
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.db import apply_sqlite_pragmas
+
+
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+FEED_QUERY = 'SELECT id, text FROM post ORDER BY pub_date DESC LIMIT 10'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость чтения ленты из SQLite во время серии записей: '
+        'с журналом по умолчанию и с настройками SQLITE_PRAGMAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writes', type=int, default=1000,
+            help='Количество записей, каждая в своей транзакции'
+        )
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Количество читающих потоков'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Количество строк в таблице до начала замера'
+        )
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(path, timeout=20)
+        apply_sqlite_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def prepare(self, path, pragmas, rows):
+        connection = self.connect(path, pragmas)
+        with connection:
+            connection.execute(
+                'CREATE TABLE post (id INTEGER PRIMARY KEY, '
+                'pub_date REAL NOT NULL, text TEXT NOT NULL)'
+            )
+            connection.execute('CREATE INDEX post_pub_date ON post (pub_date)')
+            connection.executemany(
+                'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+                ((time.time(), 'Текст поста ' * 20) for _ in range(rows))
+            )
+        connection.close()
+
+    def measure(self, pragmas, writes, readers, rows):
+        """Запускает серию записей и читателей, возвращает
+        чтений в секунду, записей в секунду и число отказов чтения"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            self.prepare(path, pragmas, rows)
+            stop = threading.Event()
+            reads = [0] * readers
+            failures = [0] * readers
+
+            def read(number):
+                connection = self.connect(path, pragmas)
+                while not stop.is_set():
+                    try:
+                        connection.execute(FEED_QUERY).fetchall()
+                        reads[number] += 1
+                    except sqlite3.OperationalError:
+                        failures[number] += 1
+                connection.close()
+
+            threads = [
+                threading.Thread(target=read, args=(number,))
+                for number in range(readers)
+            ]
+            for thread in threads:
+                thread.start()
+            writer = self.connect(path, pragmas)
+            started = time.perf_counter()
+            for _ in range(writes):
+                with writer:
+                    writer.execute(
+                        'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+                        (time.time(), 'Комментарий')
+                    )
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for thread in threads:
+                thread.join()
+            writer.close()
+        return sum(reads) / elapsed, writes / elapsed, sum(failures)
+
+    def handle(self, *args, **options):
+        modes = {
+            'по умолчанию': DEFAULT_PRAGMAS,
+            'SQLITE_PRAGMAS': getattr(settings, 'SQLITE_PRAGMAS', {}),
+        }
+        self.stdout.write(
+            f'{"режим":<16}{"чтений/с":>12}{"записей/с":>12}{"отказов":>10}'
+        )
+        for title, pragmas in modes.items():
+            reads, writes, failures = self.measure(
+                pragmas, options['writes'], options['readers'],
+                options['rows']
+            )
+            self.stdout.write(
+                f'{title:<16}{reads:>12.0f}{writes:>12.0f}{failures:>10}'
+            )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import EXPORT_FIELDS, dump_row, export_rows, open_dump
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в формате JSON Lines, читая таблицы порциями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки, .gz сжимается; по умолчанию stdout'
+        )
+        parser.add_argument(
+            '--models', nargs='+', default=list(EXPORT_FIELDS),
+            help='Выгружаемые модели, например posts.post posts.comment'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Количество записей, читаемых одним запросом'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['models']) - set(EXPORT_FIELDS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные модели: {", ".join(sorted(unknown))}'
+            )
+        counts = {}
+        if options['path'] == '-':
+            dump = self.stdout
+        else:
+            dump = open_dump(options['path'], 'w')
+        try:
+            # Порядок выгрузки не зависит от порядка в --models
+            for label in EXPORT_FIELDS:
+                if label not in options['models']:
+                    continue
+                counts[label] = 0
+                for row in export_rows(label, options['chunk_size']):
+                    dump.write(dump_row(label, row) + '\n')
+                    counts[label] += 1
+        finally:
+            if options['path'] != '-':
+                dump.close()
+        self.stderr.write(', '.join(
+            f'{label}: {count}' for label, count in counts.items()
+        ))
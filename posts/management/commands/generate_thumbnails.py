@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+def init_worker():
+    # Процесс, запущенный через spawn, не наследует настроенный Django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для постов, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Проверить все посты с изображениями, например после '
+                 'добавления новых размеров или форматов миниатюр'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Количество процессов, создающих миниатюры'
+        )
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            post_ids = post_ids.filter(image_hash='')
+        post_ids = list(post_ids.values_list('pk', flat=True))
+        if options['workers'] > 1:
+            # Соединение с базой нельзя делить между процессами
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=init_worker
+            ) as pool:
+                results = list(pool.map(
+                    generate_thumbnails, post_ids, chunksize=16
+                ))
+        else:
+            results = [generate_thumbnails(post_id) for post_id in post_ids]
+        done = sum(1 for content_hash in results if content_hash)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано миниатюр для постов: {done}'
+        ))
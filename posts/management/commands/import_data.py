@@ -0,0 +1,120 @@
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts.bulk import rebuild_derived
+from posts.transfer import (EXPORT_FIELDS, import_chunk, open_dump,
+                            reset_sequences)
+
+
+def init_worker():
+    # Процесс, запущенный через spawn, не наследует настроенный Django
+    django.setup()
+
+
+def read_chunks(dump, size):
+    """Генератор порций подряд идущих строк одной модели"""
+    label, rows = None, []
+    for number, line in enumerate(dump, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: {error}')
+        model = row.pop('model', None)
+        if model not in EXPORT_FIELDS:
+            raise CommandError(f'Строка {number}: неизвестная модель {model}')
+        if rows and (model != label or len(rows) >= size):
+            yield label, rows
+            rows = []
+        label = model
+        rows.append(row)
+    if rows:
+        yield label, rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_data порциями через bulk_create. '
+        'Рассчитана на пустую базу или повтор прерванной загрузки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки, .gz распаковывается; по умолчанию stdin'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной транзакции'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество процессов, загружающих порции одной модели. '
+                 'Ускоряет загрузку в PostgreSQL, SQLite пишет по очереди'
+        )
+
+    def handle(self, *args, **options):
+        self.totals = {}
+        if options['path'] == '-':
+            dump = sys.stdin
+        else:
+            dump = open_dump(options['path'], 'r')
+        try:
+            chunks = read_chunks(dump, options['batch_size'])
+            workers = options['workers']
+            if workers > 1 and connections['default'].vendor == 'sqlite':
+                # Транзакция SQLite, начатая чтением, не может получить
+                # блокировку записи, пока пишет другой процесс
+                self.stderr.write(
+                    'SQLite не поддерживает параллельную запись, '
+                    'загрузка идёт в одном процессе'
+                )
+                workers = 1
+            if workers > 1:
+                self.import_parallel(chunks, workers)
+            else:
+                for label, rows in chunks:
+                    self.add(label, import_chunk(label, rows))
+        finally:
+            if options['path'] != '-':
+                dump.close()
+        reset_sequences()
+        rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{label}: загружено {loaded}, пропущено {skipped}'
+            for label, (loaded, skipped) in self.totals.items()
+        )))
+
+    def add(self, label, result):
+        loaded, skipped = self.totals.get(label, (0, 0))
+        self.totals[label] = (loaded + result[0], skipped + result[1])
+
+    def import_parallel(self, chunks, workers):
+        """Порции одной модели загружаются параллельно. Перед следующей
+        моделью загрузка дожидается предыдущей, чтобы ссылки находились.
+        В работе не больше двух порций на процесс, поэтому память
+        не зависит от размера выгрузки"""
+        # Соединение с базой нельзя делить между процессами
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker
+        ) as pool:
+            pending = deque()
+            current = None
+            for label, rows in chunks:
+                if label != current:
+                    while pending:
+                        self.add(current, pending.popleft().result())
+                    current = label
+                if len(pending) >= workers * 2:
+                    self.add(current, pending.popleft().result())
+                pending.append(pool.submit(import_chunk, label, rows))
+            while pending:
+                self.add(current, pending.popleft().result())
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_user_stats
+from posts.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='store_true',
+            help='Поставить пересчёт в фоновую очередь'
+        )
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            enqueue('recount_user_stats', unique=True)
+            self.stdout.write(self.style.SUCCESS(
+                'Пересчёт поставлен в очередь'
+            ))
+            return
+        updated = recount_user_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено записей: {updated}'
+        ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.tasks import queue_depth, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчик фоновой очереди задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков обработчика'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать количество задач в очереди и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for status, count in queue_depth().items():
+                self.stdout.write(f'{status}: {count}')
+            return
+        while True:
+            done = run_pending(workers=options['workers'])
+            if options['once']:
+                if not done:
+                    break
+                continue
+            if not done:
+                time.sleep(options['poll_interval'])
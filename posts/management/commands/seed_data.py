@@ -0,0 +1,209 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from posts.bulk import chunked, explicit_dates, rebuild_derived
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+# Показатель распределения Парето: чем меньше, тем сильнее
+# активность сосредоточена у немногих авторов, групп и постов
+POPULARITY_SHAPE = 1.2
+# Доля постов, опубликованных в группах
+GROUP_SHARE = 0.7
+# Пароль всех созданных пользователей, чтобы под ними можно было войти
+PASSWORD = 'seed-password'
+
+
+def popularity(count):
+    """Функция построения накопленных весов с длинным хвостом"""
+    return list(accumulate(
+        random.paretovariate(POPULARITY_SHAPE) for _ in range(count)
+    ))
+
+
+def pick(population, cum_weights, count):
+    return random.choices(population, cum_weights=cum_weights, k=count)
+
+
+def next_pk(model):
+    """Функция получения ключа, с которого начнутся новые записи.
+    Он же делает уникальными имена созданных пользователей и групп"""
+    last = model.objects.order_by('-pk').values_list('pk', flat=True)
+    return (last.first() or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу правдоподобными пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных замеров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить публикации'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Количество объектов, создаваемых в одной транзакции. '
+                 'Размер отдельного INSERT выбирает Django по ограничениям '
+                 'базы'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Начальное значение генератора для воспроизводимых данных'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+            mixer.faker.seed_instance(options['seed'])
+        mixer.faker.locale = 'ru'
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'])
+        self.create_posts(options['posts'], users, groups)
+        self.create_comments(options['comments'], users)
+        follows = self.create_follows(options['follows'], users)
+        rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {options["posts"]}, комментариев {options["comments"]}, '
+            f'подписок {len(follows)}'
+        ))
+
+    def random_date(self, since=None):
+        since = since or self.start
+        return since + (self.now - since) * random.random()
+
+    def create_users(self, count):
+        offset = next_pk(User)
+        password = make_password(PASSWORD)
+        with mixer.ctx(commit=False):
+            users = mixer.cycle(count).blend(
+                User,
+                username=mixer.sequence(
+                    lambda number: f'seed{offset + number}'
+                ),
+                password=password, is_staff=False, is_superuser=False,
+                first_name=mixer.faker.first_name,
+                last_name=mixer.faker.last_name,
+            ) if count else []
+        User.objects.bulk_create(users)
+        # SQLite не возвращает первичные ключи из bulk_create
+        return list(User.objects.filter(pk__gte=offset))
+
+    def create_groups(self, count):
+        offset = next_pk(Group)
+        with mixer.ctx(commit=False):
+            groups = mixer.cycle(count).blend(
+                Group,
+                slug=mixer.sequence(lambda number: f'seed{offset + number}'),
+                title=mixer.faker.catch_phrase,
+                description=mixer.faker.paragraph,
+            ) if count else []
+        Group.objects.bulk_create(groups)
+        return list(Group.objects.filter(pk__gte=offset))
+
+    def create_posts(self, count, users, groups):
+        """Посты пишут в основном немногие активные авторы,
+        а группы различаются по популярности"""
+        if not users:
+            return
+        author_weights = popularity(len(users))
+        group_weights = popularity(len(groups))
+        fields = [Post._meta.get_field('pub_date'),
+                  Post._meta.get_field('updated')]
+        with explicit_dates(*fields):
+            for size in chunked(range(count), self.batch_size):
+                size = len(size)
+                authors = pick(users, author_weights, size)
+                dates = sorted(self.random_date() for _ in range(size))
+                with mixer.ctx(commit=False):
+                    posts = mixer.cycle(size).blend(
+                        Post,
+                        author=(author for author in authors),
+                        group=(
+                            pick(groups, group_weights, 1)[0]
+                            if groups and random.random() < GROUP_SHARE
+                            else None
+                            for _ in range(size)
+                        ),
+                        text=mixer.faker.text, image='', image_hash='',
+                        comment_count=0,
+                    )
+                for post, date in zip(posts, dates):
+                    post.pub_date = post.updated = date
+                with transaction.atomic():
+                    Post.objects.bulk_create(posts)
+
+    def create_comments(self, count, users):
+        """Комментарии собираются вокруг небольшого числа обсуждаемых
+        постов и пишутся после их публикации"""
+        posts = list(Post.objects.values_list('pk', 'pub_date'))
+        if not posts or not users:
+            return
+        post_weights = popularity(len(posts))
+        user_weights = popularity(len(users))
+        with explicit_dates(Comment._meta.get_field('created')):
+            for size in chunked(range(count), self.batch_size):
+                size = len(size)
+                targets = pick(posts, post_weights, size)
+                with mixer.ctx(commit=False):
+                    comments = mixer.cycle(size).blend(
+                        Comment,
+                        post_id=(post_id for post_id, _ in targets),
+                        author=(
+                            author
+                            for author in pick(users, user_weights, size)
+                        ),
+                        text=mixer.faker.sentence,
+                    )
+                for comment, (_, pub_date) in zip(comments, targets):
+                    comment.created = self.random_date(since=pub_date)
+                with transaction.atomic():
+                    Comment.objects.bulk_create(comments)
+
+    def create_follows(self, count, users):
+        """Подписываются все понемногу, а на популярных авторов —
+        многие. Повторные и собственные подписки отбрасываются"""
+        if len(users) < 2:
+            return []
+        author_weights = popularity(len(users))
+        existing = set(Follow.objects.values_list('user_id', 'author_id'))
+        pairs = set()
+        count = min(count, len(users) * (len(users) - 1) - len(existing))
+        while len(pairs) < count:
+            needed = count - len(pairs)
+            readers = random.choices(users, k=needed)
+            authors = pick(users, author_weights, needed)
+            pairs.update(
+                (reader.pk, author.pk)
+                for reader, author in zip(readers, authors)
+                if reader.pk != author.pk
+                and (reader.pk, author.pk) not in existing
+            )
+        follows = [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ]
+        with transaction.atomic():
+            Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        return follows
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# Только алгоритм стемминга, без моделей: индекс должен совпадать
+# с тем, как стеммируются поисковые запросы
+from posts.stemmer import stem_text
+
+
+SEARCH_TABLE = 'posts_search'
+
+CREATE_SQL = {
+    'sqlite': [
+        f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+        f"body, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        f'CREATE TABLE {SEARCH_TABLE} ('
+        f'post_id integer PRIMARY KEY '
+        f'REFERENCES posts_post (id) ON DELETE CASCADE '
+        f'DEFERRABLE INITIALLY DEFERRED, '
+        f'document tsvector NOT NULL)',
+        f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING GIN (document)',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_SQL:
+        return
+    for sql in CREATE_SQL[vendor]:
+        schema_editor.execute(sql)
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    comments = {}
+    for post_id, text in Comment.objects.values_list('post_id', 'text'):
+        comments.setdefault(post_id, []).append(text)
+    with schema_editor.connection.cursor() as cursor:
+        for post_id, text in Post.objects.values_list('pk', 'text').iterator():
+            document = '\n'.join([text] + comments.get(post_id, []))
+            if vendor == 'sqlite':
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (rowid, body) '
+                    f'VALUES (%s, %s)',
+                    [post_id, ' '.join(stem_text(document))]
+                )
+            else:
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (post_id, document) '
+                    f"VALUES (%s, to_tsvector('russian', %s))",
+                    [post_id, document]
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
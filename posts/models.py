@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+from .thumbnails import CARD_GEOMETRY, thumbnail_url
 
 
 User = get_user_model()
@@ -30,13 +33,39 @@ class Post(models.Model):
         help_text='Укажите "Группу"'
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    updated = models.DateTimeField("date updated", auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def card_image_url(self):
+        """Адрес миниатюры для карточки поста.
+        Пока миниатюра не готова, выводится исходное изображение"""
+        if not self.image:
+            return ''
+        if self.image_hash:
+            return thumbnail_url(self.image_hash, CARD_GEOMETRY)
+        return self.image.url
+
 
 class Comment(models.Model):
     """Модель комментариев"""
@@ -53,6 +82,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(
+            fields=['post', 'created'], name='comment_post_created_idx'
+        )]
 
 
 class Follow(models.Model):
@@ -70,3 +102,76 @@ class Follow(models.Model):
         constraints = [models.UniqueConstraint(
             fields=['user', 'author'], name='unique_follow'
         )]
+
+
+class UserStats(models.Model):
+    """Модель счётчиков пользователя: постов, подписчиков и подписок"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name="stats"
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    """Модель материализованной ленты подписок пользователя"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    # Автор и дата поста копируются, чтобы лента читалась по индексу
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'], name='unique_timeline_entry'
+        )]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'id'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author', 'pub_date'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class Task(models.Model):
+    """Модель задачи фоновой очереди"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+    name = models.CharField(max_length=100)
+    args = models.TextField(default='[]')
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [models.Index(
+            fields=['status', 'run_at'], name='task_status_run_at'
+        )]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
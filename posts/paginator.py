@@ -0,0 +1,165 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+POSTS_PER_PAGE = 10
+COUNT_LIMIT = 1000
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(direction, key, pk, number):
+    """Функция упаковки позиции в ленте в непрозрачный токен"""
+    raw = f'{direction}|{key.isoformat()}|{pk}|{number}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Функция распаковки токена курсора.
+    Для повреждённого токена возвращает None"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, key, pk, number = raw.split('|')
+        key = parse_datetime(key)
+        pk, number = int(pk), int(number)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (FORWARD, BACKWARD) or key is None or number < 1:
+        return None
+    return direction, key, pk, number
+
+
+def approximate_count(queryset, limit=COUNT_LIMIT):
+    """Функция приблизительного подсчёта записей.
+    Для нефильтрованной таблицы в PostgreSQL берётся статистика
+    планировщика, в остальных случаях счёт ограничен limit записями"""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] > limit:
+            return int(row[0])
+    return queryset.order_by()[:limit].count()
+
+
+class CursorPage(Page):
+    """Страница ленты, полученная по курсору.
+    Совместима с Page: шаблоны используют те же has_next/has_previous"""
+    def __init__(self, rows, number, paginator,
+                 has_next=False, has_previous=False):
+        super().__init__(paginator.items(rows), number, paginator)
+        self.rows = rows
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(
+            FORWARD, self.rows[-1], self.number + 1
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(
+            BACKWARD, self.rows[0], self.number - 1
+        )
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (key_field, id) без OFFSET.
+    Стоимость запроса не зависит от глубины страницы, а общее
+    количество записей считается приблизительно.
+    Если задан item_attr, страница выводит не сами записи,
+    а их атрибут (например, пост записи ленты)"""
+    def __init__(self, object_list, per_page, key_field='pub_date',
+                 count_limit=COUNT_LIMIT, item_attr=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key_field = key_field
+        self.count_limit = count_limit
+        self.item_attr = item_attr
+
+    def items(self, rows):
+        if self.item_attr is None:
+            return rows
+        return [getattr(row, self.item_attr) for row in rows]
+
+    @cached_property
+    def count(self):
+        return approximate_count(self.object_list, self.count_limit)
+
+    def cursor_for(self, direction, obj, number):
+        return encode_cursor(
+            direction, getattr(obj, self.key_field), obj.pk, number
+        )
+
+    def page_queryset(self, position=None):
+        """Функция построения запроса страницы по позиции курсора.
+        Возвращает на одну запись больше, чтобы узнать о следующей"""
+        key = self.key_field
+        queryset = self.object_list
+        limit = self.per_page + 1
+        if position is None:
+            return queryset.order_by(f'-{key}', '-pk')[:limit]
+        direction, value, pk = position[:3]
+        if direction == FORWARD:
+            return queryset.filter(
+                Q(**{f'{key}__lt': value}) | Q(**{key: value, 'pk__lt': pk})
+            ).order_by(f'-{key}', '-pk')[:limit]
+        return queryset.filter(
+            Q(**{f'{key}__gt': value}) | Q(**{key: value, 'pk__gt': pk})
+        ).order_by(key, 'pk')[:limit]
+
+    def get_cursor_page(self, cursor=None):
+        """Функция получения страницы по токену курсора.
+        Пустой, повреждённый или устаревший токен ведёт
+        на первую страницу"""
+        position = decode_cursor(cursor) if cursor else None
+        rows = list(self.page_queryset(position))
+        if position is None:
+            return CursorPage(
+                rows[:self.per_page], 1, self,
+                has_next=len(rows) > self.per_page
+            )
+        direction, number = position[0], position[3]
+        if direction == FORWARD:
+            if not rows:
+                return self.get_cursor_page()
+            return CursorPage(
+                rows[:self.per_page], number, self,
+                has_next=len(rows) > self.per_page,
+                has_previous=True
+            )
+        if len(rows) <= self.per_page:
+            return self.get_cursor_page()
+        return CursorPage(
+            rows[:self.per_page][::-1], number, self,
+            has_next=True, has_previous=True
+        )
@@ -0,0 +1,182 @@
+from django.db import connection
+
+from .models import Comment, Post
+from .stemmer import stem_text
+
+
+SEARCH_TABLE = 'posts_search'
+
+
+class SqliteSearchBackend:
+    """Индекс на FTS5. Слова хранятся уже приведёнными к основе"""
+
+    def index(self, cursor, post_id, document):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, body) VALUES (%s, %s)',
+            [post_id, ' '.join(stem_text(document))]
+        )
+
+    def remove(self, cursor, post_id):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+    @staticmethod
+    def match(query):
+        # Каждое слово берётся в кавычки, чтобы синтаксис FTS5
+        # в пользовательском запросе не интерпретировался
+        return ' '.join(f'"{word}"' for word in stem_text(query))
+
+    def count(self, cursor, query):
+        match = self.match(query)
+        if not match:
+            return 0
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s', [match]
+        )
+        return cursor.fetchone()[0]
+
+    def search(self, cursor, query, offset, limit):
+        match = self.match(query)
+        if not match:
+            return []
+        cursor.execute(
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY bm25({SEARCH_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+            [match, limit, offset]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Индекс на tsvector с GIN и русской конфигурацией словаря"""
+
+    def index(self, cursor, post_id, document):
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (post_id, document) '
+            f"VALUES (%s, to_tsvector('russian', %s)) "
+            f'ON CONFLICT (post_id) '
+            f'DO UPDATE SET document = EXCLUDED.document',
+            [post_id, document]
+        )
+
+    def remove(self, cursor, post_id):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE post_id = %s', [post_id]
+        )
+
+    def count(self, cursor, query):
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {SEARCH_TABLE} '
+            f"WHERE document @@ plainto_tsquery('russian', %s)", [query]
+        )
+        return cursor.fetchone()[0]
+
+    def search(self, cursor, query, offset, limit):
+        cursor.execute(
+            f'SELECT post_id FROM {SEARCH_TABLE}, '
+            f"plainto_tsquery('russian', %s) query "
+            f'WHERE document @@ query '
+            f'ORDER BY ts_rank(document, query) DESC, post_id DESC '
+            f'LIMIT %s OFFSET %s',
+            [query, limit, offset]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(vendor=None):
+    """Функция выбора поискового движка по типу базы данных.
+    Для баз без полнотекстового индекса возвращает None"""
+    backend = BACKENDS.get(vendor or connection.vendor)
+    return backend() if backend else None
+
+
+def post_document(post_id):
+    """Функция сборки текста поста вместе с комментариями к нему"""
+    texts = [Post.objects.filter(pk=post_id).values_list(
+        'text', flat=True
+    ).first() or '']
+    texts.extend(
+        Comment.objects.filter(post_id=post_id).values_list('text', flat=True)
+    )
+    return '\n'.join(texts)
+
+
+def index_post(post_id):
+    """Функция обновления записи поста в поисковом индексе"""
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.index(cursor, post_id, post_document(post_id))
+
+
+def index_posts(post_ids):
+    """Функция индексации набора постов за один проход.
+    Нужна для массовой загрузки, где сигналы не срабатывают"""
+    backend = get_backend()
+    if backend is None:
+        return
+    comments = {}
+    for post_id, text in Comment.objects.filter(
+        post_id__in=post_ids
+    ).values_list('post_id', 'text'):
+        comments.setdefault(post_id, []).append(text)
+    posts = Post.objects.filter(pk__in=post_ids).values_list('pk', 'text')
+    with connection.cursor() as cursor:
+        for post_id, text in posts:
+            backend.index(
+                cursor, post_id, '\n'.join([text] + comments.get(post_id, []))
+            )
+
+
+def remove_post(post_id):
+    """Функция удаления поста из поискового индекса"""
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, post_id)
+
+
+class SearchResults:
+    """Ленивая выборка найденных постов по релевантности.
+    Поддерживает count() и срезы, поэтому подходит для Paginator"""
+    def __init__(self, query):
+        self.query = query
+        self.backend = get_backend()
+
+    def count(self):
+        if self.backend is None or not self.query.strip():
+            return 0
+        with connection.cursor() as cursor:
+            return self.backend.count(cursor, self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        if self.backend is None or not self.query.strip():
+            return []
+        with connection.cursor() as cursor:
+            post_ids = self.backend.search(
+                cursor, self.query, start, key.stop - start
+            )
+        posts = Post.objects.select_related(
+            'author', 'group'
+        ).in_bulk(post_ids)
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
@@ -0,0 +1,144 @@
+import threading
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import change_user_stats, get_user_stats
+from .models import Comment, Follow, Group, Post
+from .search import index_post, remove_post
+from .tasks import enqueue
+from .timeline import (INLINE_FANOUT_LIMIT, backfill_timeline, fan_out_post,
+                       trim_timeline)
+
+
+# Посты, удаляемые в текущем потоке. Их комментарии удаляются
+# каскадно, и пересчитывать для них счётчик и индекс не нужно
+_deleting = threading.local()
+
+
+def deleting_posts():
+    """Функция получения ключей постов, удаляемых в текущем потоке"""
+    if not hasattr(_deleting, 'post_ids'):
+        _deleting.post_ids = set()
+    return _deleting.post_ids
+
+
+@receiver(pre_delete, sender=Post)
+def mark_deleting_post(sender, instance, **kwargs):
+    """Функция пометки поста перед удалением.
+    pre_delete поста приходит раньше, чем удаляются его комментарии"""
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unmark_deleted_post(sender, instance, **kwargs):
+    """Функция снятия пометки после удаления поста"""
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Функция увеличения счётчика комментариев поста"""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1, updated=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Функция уменьшения счётчика комментариев поста"""
+    if instance.post_id in deleting_posts():
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1, updated=timezone.now())
+
+
+@receiver(post_save, sender=Group)
+def touch_group_posts(sender, instance, created, **kwargs):
+    """Функция обновления версий постов после изменения сообщества,
+    чтобы кэш лент не показывал старое название"""
+    if not created:
+        Post.objects.filter(group=instance).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    """Функция увеличения счётчика постов автора"""
+    if created:
+        change_user_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    """Функция уменьшения счётчика постов автора"""
+    change_user_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    """Функция увеличения счётчиков подписчиков и подписок"""
+    if created:
+        change_user_stats(instance.author_id, followers_count=1)
+        change_user_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counts(sender, instance, **kwargs):
+    """Функция уменьшения счётчиков подписчиков и подписок"""
+    change_user_stats(instance.author_id, followers_count=-1)
+    change_user_stats(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """Функция раскладки нового поста по лентам подписчиков.
+    Для авторов с большим числом подписчиков раскладка уходит
+    в фоновую очередь"""
+    if not created:
+        return
+    followers = get_user_stats(instance.author).followers_count
+    if followers <= INLINE_FANOUT_LIMIT:
+        fan_out_post(instance)
+    else:
+        enqueue('fan_out_post', instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_followed_author(sender, instance, created, **kwargs):
+    """Функция заполнения ленты постами нового автора в подписках"""
+    if created and instance.user_id and instance.author_id:
+        backfill_timeline(instance.user_id, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_unfollowed_author(sender, instance, **kwargs):
+    """Функция очистки ленты от постов автора после отписки"""
+    if instance.user_id and instance.author_id:
+        trim_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    """Функция обновления поискового индекса после сохранения поста"""
+    index_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_post(sender, instance, **kwargs):
+    """Функция удаления поста из поискового индекса"""
+    remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def index_commented_post(sender, instance, **kwargs):
+    """Функция переиндексации поста после изменения его комментариев"""
+    if kwargs['signal'] is post_delete and (
+        instance.post_id in deleting_posts()
+    ):
+        return
+    index_post(instance.post_id)
@@ -0,0 +1,114 @@
+"""Стеммер русского языка по алгоритму Snowball.
+
+Нужен для полнотекстового поиска в SQLite: FTS5 не умеет приводить
+русские слова к основе, поэтому текст и запрос стеммируются до индексации.
+PostgreSQL делает то же самое сам через конфигурацию 'russian'.
+"""
+import re
+
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'),
+                     ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+ADJECTIVE = ((), ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый',
+                  'ой', 'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому',
+                  'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'))
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+         'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+         'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+         'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ((), ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи',
+             'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием',
+             'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+             'ью', 'ю', 'ия', 'ья', 'я'))
+DERIVATIONAL = ((), ('ост', 'ость'))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _regions(word):
+    """Возвращает начало областей RV и R2 слова"""
+    rv = r1 = r2 = len(word)
+    for i, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, endings):
+    """Отрезает самое длинное окончание из группы, лежащее в области start.
+    Окончания первой группы отрезаются, только если перед ними а или я.
+    Если окончание не найдено, возвращает None"""
+    after_a, plain = endings
+    best, needs_a = '', False
+    for group, flag in ((after_a, True), (plain, False)):
+        for ending in group:
+            if (len(ending) > len(best) and word.endswith(ending)
+                    and len(word) - len(ending) >= start):
+                best, needs_a = ending, flag
+    if not best:
+        return None
+    cut = len(word) - len(best)
+    if needs_a and not (cut - 1 >= start and word[cut - 1] in 'ая'):
+        return None
+    return word[:cut]
+
+
+def stem(word):
+    """Функция приведения русского слова к основе"""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    stripped = _strip(word, rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        word = stripped
+    else:
+        stripped = _strip(word, rv, REFLEXIVE)
+        if stripped is not None:
+            word = stripped
+        stripped = _strip(word, rv, ADJECTIVE)
+        if stripped is not None:
+            word = stripped
+            stripped = _strip(word, rv, PARTICIPLE)
+            if stripped is not None:
+                word = stripped
+        else:
+            stripped = _strip(word, rv, VERB)
+            if stripped is None:
+                stripped = _strip(word, rv, NOUN)
+            if stripped is not None:
+                word = stripped
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    stripped = _strip(word, r2, DERIVATIONAL)
+    if stripped is not None:
+        word = stripped
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        stripped = _strip(word, rv, SUPERLATIVE)
+        if stripped is not None:
+            word = stripped
+            if word.endswith('нн'):
+                word = word[:-1]
+        elif word.endswith('ь') and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def stem_text(text):
+    """Функция разбиения текста на слова и приведения их к основам"""
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
@@ -0,0 +1,173 @@
+import json
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import counters
+from .caching import FEED_CACHE_TTL
+from .models import Post, Task
+from .thumbnails import generate_thumbnails as build_thumbnails
+from .timeline import fan_out_post as fan_out
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Задержка перед повтором удваивается с каждой неудачной попыткой
+RETRY_DELAY = 10
+# Задача, которую обработчик не завершил за это время, возвращается в очередь
+LOCK_TIMEOUT = 300
+
+TASKS = {}
+
+
+def task(func):
+    """Декоратор регистрации функции как фоновой задачи"""
+    TASKS[func.__name__] = func
+    return func
+
+
+def enqueue(name, *args, delay=0, unique=False):
+    """Функция постановки задачи в очередь.
+    Задача видна обработчику только после фиксации транзакции.
+    С unique=True задача не ставится повторно, пока такая же
+    (с теми же аргументами) ещё ждёт выполнения"""
+    if name not in TASKS:
+        raise KeyError(f'Неизвестная задача: {name}')
+    if unique:
+        pending = Task.objects.filter(
+            name=name, args=json.dumps(args), status=Task.PENDING
+        ).first()
+        if pending is not None:
+            return pending
+    return Task.objects.create(
+        name=name, args=json.dumps(args),
+        run_at=timezone.now() + timedelta(seconds=delay)
+    )
+
+
+def queue_depth():
+    """Функция подсчёта задач в очереди по статусам"""
+    depth = {status: 0 for status, _ in Task.STATUS_CHOICES}
+    depth.update(
+        Task.objects.order_by().values_list('status').annotate(Count('pk'))
+    )
+    return depth
+
+
+def release_stale_tasks():
+    """Функция возврата в очередь задач упавших обработчиков"""
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_until__lt=timezone.now()
+    ).update(status=Task.PENDING, locked_until=None)
+
+
+def claim_tasks(limit):
+    """Функция захвата готовых к выполнению задач.
+    Захват через условный UPDATE не даёт двум обработчикам
+    взять одну задачу"""
+    now = timezone.now()
+    task_ids = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).values_list('pk', flat=True)[:limit]
+    claimed = []
+    for task_id in task_ids:
+        if Task.objects.filter(pk=task_id, status=Task.PENDING).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(seconds=LOCK_TIMEOUT)
+        ):
+            claimed.append(task_id)
+    return claimed
+
+
+def fail_task(queued, error):
+    """Функция учёта неудачной попытки: повтор с задержкой
+    или окончательная ошибка после MAX_ATTEMPTS попыток"""
+    queued.attempts += 1
+    queued.last_error = error
+    queued.locked_until = None
+    if queued.attempts >= MAX_ATTEMPTS:
+        queued.status = Task.FAILED
+    else:
+        queued.status = Task.PENDING
+        queued.run_at = timezone.now() + timedelta(
+            seconds=RETRY_DELAY * 2 ** (queued.attempts - 1)
+        )
+    queued.save()
+
+
+def run_task(task_id):
+    """Функция выполнения одной захваченной задачи"""
+    queued = Task.objects.get(pk=task_id)
+    try:
+        TASKS[queued.name](*json.loads(queued.args))
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', queued)
+        fail_task(queued, traceback.format_exc())
+    else:
+        queued.delete()
+
+
+def _run_in_thread(task_id):
+    try:
+        run_task(task_id)
+    finally:
+        connection.close()
+
+
+def run_pending(workers=1, limit=None):
+    """Функция выполнения очередной порции задач.
+    Возвращает количество выполненных задач"""
+    release_stale_tasks()
+    task_ids = claim_tasks(limit or workers * 10)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_run_in_thread, task_ids))
+    else:
+        for task_id in task_ids:
+            run_task(task_id)
+    return len(task_ids)
+
+
+@task
+def generate_thumbnails(post_id):
+    build_thumbnails(post_id)
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        fan_out(post)
+
+
+@task
+def warm_index_cache():
+    """Задача прогрева кэша первой страницы главной ленты
+    для анонимных посетителей"""
+    from .views import index_context
+
+    render_to_string('index.html', {
+        **index_context(), 'user': AnonymousUser(),
+        'cache_ttl': FEED_CACHE_TTL,
+    })
+
+
+@task
+def recount_comments(*post_ids):
+    """Задача сверки счётчиков комментариев постов post_ids
+    или всех постов с таблицей комментариев"""
+    counters.recount_comments(list(post_ids) or None)
+
+
+@task
+def recount_user_stats():
+    """Задача сверки счётчиков пользователей с исходными таблицами"""
+    counters.recount_user_stats()
@@ -0,0 +1,17 @@
+from django import template
+
+from posts.thumbnails import CARD_SIZES, card_sources
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('card_picture.html')
+def card_picture(post):
+    """Тег вывода изображения карточки поста в нескольких размерах
+    и форматах. Пока миниатюры не готовы, выводится исходный файл"""
+    return {
+        'src': post.card_image_url,
+        'sources': card_sources(post.image_hash) if post.image_hash else [],
+        'sizes': CARD_SIZES,
+    }
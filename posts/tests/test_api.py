@@ -0,0 +1,180 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.timeline import backfill_timeline
+from yatube.metrics import assert_query_budget
+
+
+USERNAME = 'leo'
+SLUG = 'diary'
+API_INDEX_URL = reverse('api_index')
+API_GROUP_URL = reverse('api_group_posts', args=[SLUG])
+API_PROFILE_URL = reverse('api_profile', args=[USERNAME])
+API_FOLLOW_URL = reverse('api_follow_index')
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username=USERNAME, first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = get_user_model().objects.create_user(username='sofia')
+        cls.group = Group.objects.create(
+            title='Дневник', slug=SLUG, description='Записи'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group if number % 2 else None,
+                text=f'Запись {number}'
+            )
+            for number in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[-1], author=cls.reader, text='Ответ'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        backfill_timeline(cls.reader.pk, cls.user)
+        cls.post_url = reverse('api_post', args=[USERNAME, cls.posts[-1].pk])
+
+    def setUp(self):
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def test_feeds_mirror_pages(self):
+        """Ленты API содержат те же посты, что и страницы сайта"""
+        feeds = {
+            API_INDEX_URL: (self.client, 15),
+            API_GROUP_URL: (self.client, 7),
+            API_PROFILE_URL: (self.client, 15),
+            API_FOLLOW_URL: (self.reader_client, 15),
+        }
+        for url, (client, total) in feeds.items():
+            with self.subTest(url=url):
+                ids = []
+                params = {}
+                while True:
+                    data = self.get_json(url, client, **params)
+                    ids.extend(post['id'] for post in data['results'])
+                    if data['next'] is None:
+                        break
+                    params = {'cursor': data['next']}
+                self.assertEqual(len(ids), total)
+                self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_post_fields(self):
+        post = self.get_json(API_INDEX_URL)['results'][0]
+        self.assertEqual(post, {
+            'id': self.posts[-1].pk,
+            'text': 'Запись 14',
+            'pub_date': post['pub_date'],
+            'updated': post['updated'],
+            'author': USERNAME,
+            'author_name': 'Лев Толстой',
+            'group': None,
+            'comment_count': 1,
+            'image': None,
+            'url': reverse('post', args=[USERNAME, self.posts[-1].pk]),
+        })
+
+    def test_sparse_fields(self):
+        """Параметр fields оставляет в ответе только выбранные поля"""
+        data = self.get_json(API_INDEX_URL, fields='id,group', limit=3)
+        self.assertEqual(data['results'], [
+            {'id': post.pk, 'group': SLUG if number % 2 else None}
+            for number, post in reversed(list(enumerate(self.posts)))
+        ][:3])
+
+    def test_bad_parameters(self):
+        for params in ({'fields': 'id,password'}, {'limit': '0'},
+                       {'limit': '1000'}, {'limit': 'x'}):
+            with self.subTest(params=params):
+                response = self.client.get(API_INDEX_URL, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+    def test_profile_and_group_headers(self):
+        data = self.get_json(API_PROFILE_URL, self.reader_client)
+        self.assertEqual(data['author'], {
+            'username': USERNAME, 'name': 'Лев Толстой', 'posts_count': 15,
+            'followers_count': 1, 'following_count': 0, 'following': True,
+        })
+        data = self.get_json(API_GROUP_URL)
+        self.assertEqual(data['group']['title'], 'Дневник')
+
+    def test_post_with_comments(self):
+        data = self.get_json(self.post_url, fields='id,text')
+        self.assertEqual(
+            data['post'], {'id': self.posts[-1].pk, 'text': 'Запись 14'}
+        )
+        self.assertEqual(data['author']['posts_count'], 15)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']], ['Ответ']
+        )
+
+    def test_errors(self):
+        cases = {
+            reverse('api_group_posts', args=['cats']): 404,
+            reverse('api_profile', args=['nobody']): 404,
+            reverse('api_post', args=[USERNAME, 999]): 404,
+            API_FOLLOW_URL: 401,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        self.assertEqual(self.client.post(API_INDEX_URL).status_code, 405)
+
+    def test_not_modified(self):
+        for url in (API_INDEX_URL, API_PROFILE_URL, self.post_url):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        etag = self.client.get(API_INDEX_URL)['ETag']
+        response = self.client.get(
+            API_INDEX_URL, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_gzip(self):
+        """Сжатый ответ получает слабый ETag, который тоже подходит
+        для условного запроса"""
+        response = self.client.get(
+            API_INDEX_URL, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 10)
+        response = self.client.get(
+            API_INDEX_URL, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_query_count_independent_of_page_size(self):
+        for url, client, budget in (
+            (API_INDEX_URL, self.client, 1),
+            (API_GROUP_URL, self.client, 2),
+            (API_PROFILE_URL, self.client, 2),
+            (API_FOLLOW_URL, self.reader_client, 4),
+            (self.post_url, self.client, 3),
+        ):
+            for fields in ('id', 'id,author_name,group,url'):
+                with self.subTest(url=url, fields=fields):
+                    with assert_query_budget(budget):
+                        client.get(url, {'fields': fields, 'limit': 100})
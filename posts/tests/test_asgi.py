@@ -0,0 +1,114 @@
+import asyncio
+
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase
+
+from yatube.handlers import ASGIHandler
+
+
+def echo_application(environ, start_response):
+    """WSGI-приложение, возвращающее данные запроса"""
+    body = environ['wsgi.input'].read()
+    path = environ['PATH_INFO'].encode('latin-1').decode()
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    return [
+        f'{environ["REQUEST_METHOD"]} {path} '
+        f'{environ["QUERY_STRING"]} {environ.get("HTTP_X_TOKEN")} '.encode(),
+        body,
+    ]
+
+
+def streaming_application(environ, start_response):
+    """WSGI-приложение с потоковым ответом из трёх частей"""
+    response = StreamingHttpResponse(iter([b'one', b'', b'two', b'three']))
+    start_response('200 OK', list(response.items()))
+    return response
+
+
+def cookie_application(environ, start_response):
+    """WSGI-приложение, возвращающее заголовок Cookie"""
+    start_response('200 OK', [])
+    return [environ['HTTP_COOKIE'].encode()]
+
+
+def call(handler, scope, chunks):
+    """Выполняет ASGI-запрос и возвращает отправленные сообщения"""
+    incoming = [
+        {'type': 'http.request', 'body': chunk,
+         'more_body': number < len(chunks) - 1}
+        for number, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(handler(scope, receive, send))
+    return sent
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.handler = ASGIHandler(echo_application, workers=2)
+        self.addCleanup(self.handler.executor.shutdown)
+
+    def scope(self, **kwargs):
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': '/путь/',
+            'query_string': b'q=1', 'headers': [(b'x-token', b'abc')],
+        }
+        scope.update(kwargs)
+        return scope
+
+    def test_request_passed_to_wsgi(self):
+        start, body = call(self.handler, self.scope(), [b'te', b'xt'])
+        self.assertEqual(start['status'], 201)
+        self.assertIn((b'content-type', b'text/plain'), start['headers'])
+        self.assertEqual(
+            body['body'].decode(), 'POST /путь/ q=1 abc text'
+        )
+
+    def test_multiple_cookie_headers_joined_with_semicolon(self):
+        handler = ASGIHandler(cookie_application, workers=1)
+        self.addCleanup(handler.executor.shutdown)
+        _, body = call(handler, self.scope(headers=[
+            (b'cookie', b'sessionid=abc'), (b'cookie', b'csrftoken=xyz'),
+        ]), [b''])
+        self.assertEqual(body['body'], b'sessionid=abc; csrftoken=xyz')
+
+    def test_streaming_response_sent_in_chunks(self):
+        """Потоковый ответ отправляется по частям, а не собирается целиком"""
+        handler = ASGIHandler(streaming_application, workers=1)
+        self.addCleanup(handler.executor.shutdown)
+        start, *chunks = call(handler, self.scope(), [b''])
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(
+            [(chunk['body'], chunk.get('more_body', False))
+             for chunk in chunks],
+            [(b'one', True), (b'two', True), (b'three', True), (b'', False)]
+        )
+
+    def test_disconnect_before_body_skips_application(self):
+        self.assertEqual(call(self.handler, self.scope(), []), [])
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
@@ -0,0 +1,148 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.counters import count_user_stats, get_user_stats
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import SearchResults
+from yatube.metrics import assert_query_budget
+
+
+BATCH_URL = reverse('api_batch')
+
+
+class BatchApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='leo')
+        cls.reader = User.objects.create_user(username='sofia')
+        cls.author = User.objects.create_user(username='chekhov')
+        cls.group = Group.objects.create(
+            title='Дневник', slug='diary', description='Записи'
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Рассказ')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for user in (cls.user, cls.reader, cls.author):
+            get_user_stats(user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def send(self, payload, client=None):
+        return (client or self.client).post(
+            BATCH_URL, json.dumps(payload), content_type='application/json'
+        )
+
+    def assert_stats_consistent(self):
+        for user in (self.user, self.reader, self.author):
+            stats = get_user_stats(type(user).objects.get(pk=user.pk))
+            for field, value in count_user_stats(user.pk).items():
+                self.assertEqual(getattr(stats, field), value, field)
+
+    def test_create_posts(self):
+        """Посты создаются одним пакетом, ошибки возвращаются по каждому"""
+        response = self.send({'posts': [
+            {'text': 'Первая запись', 'group': 'diary'},
+            {'text': ''},
+            {'text': 'Вторая запись'},
+            {'text': 'Третья', 'group': 'cats'},
+            'текст',
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['posts']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'invalid', 'created', 'invalid', 'invalid']
+        )
+        self.assertIn('text', results[1]['errors'])
+        self.assertIn('group', results[3]['errors'])
+        first = Post.objects.get(pk=results[0]['id'])
+        self.assertEqual(first.text, 'Первая запись')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(results[0]['url'], reverse('post', args=[
+            'leo', first.pk
+        ]))
+        self.assertEqual(
+            Post.objects.get(pk=results[2]['id']).text, 'Вторая запись'
+        )
+        self.assert_stats_consistent()
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader, author=self.user
+        ).count(), 2)
+        if SearchResults('запись').backend is not None:
+            self.assertEqual(SearchResults('запись').count(), 2)
+
+    def test_create_comments(self):
+        response = self.send({'comments': [
+            {'post': self.post.pk, 'text': 'Отлично'},
+            {'post': self.post.pk, 'text': 'Согласен'},
+            {'post': 999, 'text': 'Нет поста'},
+            {'post': [1], 'text': 'Неверный пост'},
+            {'post': self.post.pk},
+        ]})
+        results = response.json()['comments']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'created', 'invalid', 'invalid', 'invalid']
+        )
+        self.assertEqual(
+            Comment.objects.get(pk=results[1]['id']).text, 'Согласен'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+    def test_change_follows(self):
+        response = self.send({
+            'follow': ['chekhov', 'chekhov', 'leo', 'nobody', 5],
+            'unfollow': ['sofia'],
+        })
+        data = response.json()
+        self.assertEqual(
+            [result['status'] for result in data['follow']],
+            ['followed', 'unchanged', 'invalid', 'not_found', 'invalid']
+        )
+        self.assertEqual(data['unfollow'], [{'status': 'unchanged'}])
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.author).exists()
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.post
+        ).exists())
+        self.assert_stats_consistent()
+        data = self.send({'unfollow': ['chekhov']}).json()
+        self.assertEqual(data['unfollow'], [{'status': 'unfollowed'}])
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+        self.assert_stats_consistent()
+
+    def test_query_count_independent_of_batch_size(self):
+        """Число запросов не растёт с размером пакета, кроме записи
+        в поисковый индекс SQLite, которая идёт по одной строке"""
+        posts = [{'text': f'Пост {number}'} for number in range(100)]
+        comments = [
+            {'post': self.post.pk, 'text': f'Ответ {number}'}
+            for number in range(100)
+        ]
+        with assert_query_budget(40 + 2 * 100 + 2):
+            response = self.send({'posts': posts, 'comments': comments})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 100)
+
+    def test_bad_requests(self):
+        for body in ('не json', '[]', '{"posts": {}}'):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    BATCH_URL, body, content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+        response = self.send({'posts': [{'text': 'x'}] * 501})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.filter(author=self.user).exists())
+        self.assertEqual(self.send({}, Client()).status_code, 401)
+        self.assertEqual(self.client.get(BATCH_URL).status_code, 405)
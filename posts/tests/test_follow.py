@@ -1,12 +1,19 @@
 import shutil
 import tempfile
+import threading
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
 
-from posts.models import Post, Follow, Comment
+from posts.counters import (count_user_stats, get_user_stats,
+                            recount_user_stats)
+from posts.follows import follow_authors, unfollow_authors
+from posts.models import Post, Follow, Comment, TimelineEntry, UserStats
 
 
 USERNAME_1 = 'Smirnov'
@@ -45,6 +52,7 @@ class PostFollowTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.client_author = Client()
         self.client_subscriber = Client()
@@ -111,3 +119,186 @@ class PostFollowTests(TestCase):
         response = self.guest_client.get(PostFollowTests.post_comments_url)
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, '/auth/login/?next=/Smirnov/1/comment')
+
+    def test_profile_shows_cached_counters(self):
+        """Счётчики профиля обновляются при подписке и публикации"""
+        profile_url = reverse(
+            'profile', kwargs={'username': USERNAME_1}
+        )
+        stats = self.guest_client.get(profile_url).context.get('stats')
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 1, 0)
+        )
+        Post.objects.create(author=PostFollowTests.user_author, text='Ещё')
+        Follow.objects.filter(author=PostFollowTests.user_author).delete()
+        stats = self.guest_client.get(profile_url).context.get('stats')
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count), (2, 0)
+        )
+
+    def test_recount_user_stats_repairs_drift(self):
+        """Пересчёт исправляет рассинхронизацию счётчиков"""
+        UserStats.objects.create(
+            user=PostFollowTests.user_subscriber, following_count=7
+        )
+        recount_user_stats()
+        stats = UserStats.objects.get(user=PostFollowTests.user_subscriber)
+        self.assertEqual(stats.following_count, 1)
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента подписок пополняется при публикации
+        и очищается после отписки"""
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=PostFollowTests.user_subscriber, post=PostFollowTests.post
+        ).exists())
+        new_post = Post.objects.create(
+            author=PostFollowTests.user_author, text='Новый пост'
+        )
+        response = self.client_subscriber.get(FOLLOW_INDEX_URL)
+        self.assertIn(new_post, response.context.get('page'))
+        Follow.objects.filter(user=PostFollowTests.user_subscriber).delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=PostFollowTests.user_subscriber
+        ).exists())
+
+    def test_large_author_posts_are_read_on_demand(self):
+        """Посты автора с большим числом подписчиков не раскладываются
+        по лентам, но попадают в ленту подписок"""
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 0):
+            new_post = Post.objects.create(
+                author=PostFollowTests.user_author, text='Новый пост'
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=new_post).exists()
+            )
+            response = self.client_subscriber.get(FOLLOW_INDEX_URL)
+        self.assertIn(new_post, response.context.get('page'))
+
+
+class FollowViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(username=USERNAME_1)
+        cls.reader = get_user_model().objects.create_user(username=USERNAME_2)
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+        cls.follow_url = reverse('profile_follow', args=[USERNAME_1])
+        cls.unfollow_url = reverse('profile_unfollow', args=[USERNAME_1])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assert_follows(self, count):
+        self.assertEqual(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).count(), count)
+        self.assertEqual(
+            count_user_stats(self.author.pk)['followers_count'], count
+        )
+        self.assertEqual(UserStats.objects.get(
+            user=self.author
+        ).followers_count, count)
+        self.assertEqual(UserStats.objects.get(
+            user=self.reader
+        ).following_count, count)
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post
+        ).count(), count)
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        """Повторные подписка и отписка ничего не меняют"""
+        get_user_stats(self.author)
+        get_user_stats(self.reader)
+        for returning in (True, False):
+            with self.subTest(returning=returning), mock.patch(
+                'posts.follows.supports_returning', return_value=returning
+            ):
+                for _ in range(2):
+                    response = self.client.get(self.follow_url)
+                    self.assertRedirects(response, reverse(
+                        'profile', args=[USERNAME_1]
+                    ))
+                    self.assert_follows(1)
+                for _ in range(2):
+                    self.client.get(self.unfollow_url)
+                    self.assert_follows(0)
+
+    def test_follow_is_one_statement(self):
+        """Подписка не читает автора и подписки отдельными запросами"""
+        get_user_stats(self.author)
+        with self.assertNumQueries(2 + 2 + 1 + 2 + 2):
+            # сессия и пользователь, точка сохранения, INSERT,
+            # два счётчика и заполнение ленты
+            self.client.get(self.follow_url)
+
+    def test_follow_missing_or_self(self):
+        response = self.client.get(
+            reverse('profile_follow', args=['nobody'])
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(response.url).status_code, 404)
+        self.client.get(reverse('profile_follow', args=[USERNAME_2]))
+        self.assertFalse(Follow.objects.exists())
+
+
+class FollowConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    ROUNDS = 20
+
+    def setUp(self):
+        # Имя тестовой базы известно только после её создания
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'Общая база SQLite в памяти не ждёт блокировок других '
+                'потоков: в SQLITE_TEST_NAME должен быть путь к файлу'
+            )
+
+    def test_same_pair_from_many_threads(self):
+        """Одновременные подписки и отписки одной пары не создают
+        дубликатов и оставляют счётчики равными числу подписок"""
+        author = get_user_model().objects.create_user(username=USERNAME_1)
+        reader = get_user_model().objects.create_user(username=USERNAME_2)
+        Post.objects.create(author=author, text='Текст')
+        get_user_stats(author)
+        get_user_stats(reader)
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        lock = threading.Lock()
+        winners = [0] * self.ROUNDS
+
+        def hammer():
+            try:
+                for round_number in range(self.ROUNDS):
+                    barrier.wait()
+                    # Все потоки раунда делают одно и то же действие
+                    change = (unfollow_authors if round_number % 2
+                              else follow_authors)
+                    if change(reader.pk, [USERNAME_1]):
+                        with lock:
+                            winners[round_number] += 1
+            except Exception as error:
+                errors.append(error)
+                barrier.abort()
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=hammer) for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # Каждый раунд меняет подписку ровно в одном потоке
+        self.assertEqual(winners, [1] * self.ROUNDS)
+        follows = Follow.objects.filter(user=reader, author=author).count()
+        self.assertEqual(follows, 0)
+        for user in (author, reader):
+            stats = UserStats.objects.get(user=user)
+            for field, value in count_user_stats(user.pk).items():
+                self.assertEqual(getattr(stats, field), value, field)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), follows
+        )
@@ -1,16 +1,32 @@
 import shutil
 import tempfile
+from io import BytesIO, StringIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
-from posts.models import Group, Post
+from posts.models import Group, Post, Task
+from posts.tasks import run_pending
+from posts.thumbnails import (CARD_GEOMETRIES, available_formats,
+                              render_thumbnail, thumbnail_mode,
+                              thumbnail_name)
 
 
 USERNAME_1 = 'Smirnov'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 class PostCreateFormTest(TestCase):
@@ -40,17 +56,9 @@ class PostCreateFormTest(TestCase):
     def test_post_create(self):
         """Валидная форма создает пост. Работает редирект"""
         post_count = Post.objects.count()
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='image/gif'
         )
         form_data = {
@@ -66,10 +74,21 @@ class PostCreateFormTest(TestCase):
         self.assertRedirects(response, '/')
         self.assertEqual(Post.objects.count(), post_count+1)
         post_created = Post.objects.filter(
-            group=1, text='Текст', image='posts/small.gif'
+            group=1, text='Текст', image__regex=r'^posts/[0-9a-f]{64}\.gif$'
         )
         self.assertTrue(post_created.exists())
 
+    def test_post_create_queues_index_warming_once(self):
+        """Прогрев главной ставится в очередь вместе с постом,
+        но только один раз, пока предыдущий не выполнен"""
+        for text in ('Первый', 'Второй'):
+            self.authorized_client.post(
+                reverse('post_new'), data={'text': text}
+            )
+        self.assertEqual(
+            Task.objects.filter(name='warm_index_cache').count(), 1
+        )
+
     def test_post_edit(self):
         """При редактировании поста через форму на странице /<username>/edit
         изменяется соответствующая запись в БД и работает редирект"""
@@ -94,3 +113,68 @@ class PostCreateFormTest(TestCase):
             id=PostCreateFormTest.post.id, group=1, text='Текст is edited'
         )
         self.assertTrue(post_is_edited.exists())
+
+    def test_thumbnails_are_pregenerated(self):
+        """После загрузки изображения миниатюры всех размеров создаются
+        фоновой задачей, а шаблон выводит их готовые адреса"""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('post_new'),
+            data={'text': 'С картинкой', 'image': uploaded}
+        )
+        run_pending()
+        post = Post.objects.get(text='С картинкой')
+        self.assertTrue(post.image_hash)
+        formats = dict(available_formats())
+        for geometry in CARD_GEOMETRIES:
+            for extension in formats:
+                self.assertTrue(default_storage.exists(
+                    thumbnail_name(post.image_hash, geometry, extension)
+                ))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, post.card_image_url)
+        # WebP выводится, только если его умеет сохранять Pillow
+        if 'webp' in formats:
+            self.assertContains(response, 'type="image/webp"')
+            self.assertContains(response, '_480x170.webp 480w')
+
+    def test_backfill_command_builds_missing_variants(self):
+        post = Post.objects.create(
+            author=PostCreateFormTest.user, text='Старый пост',
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif')
+        )
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        post.refresh_from_db()
+        names = [
+            thumbnail_name(post.image_hash, geometry, extension)
+            for geometry in CARD_GEOMETRIES
+            for extension, _ in available_formats()
+        ]
+        for name in names:
+            self.assertTrue(default_storage.exists(name))
+            default_storage.delete(name)
+        call_command(
+            'generate_thumbnails', all=True, workers=1, stdout=StringIO()
+        )
+        for name in names:
+            self.assertTrue(default_storage.exists(name))
+
+    def test_thumbnails_keep_transparency(self):
+        """Прозрачность сохраняется во всех форматах, кроме JPEG"""
+        image = Image.open(BytesIO(SMALL_GIF))
+        image.info['transparency'] = 0
+        self.assertEqual(thumbnail_mode(image, 'webp'), 'RGBA')
+        self.assertEqual(thumbnail_mode(image, 'jpg'), 'RGB')
+        for extension, _ in available_formats():
+            with self.subTest(extension=extension):
+                thumbnail = Image.open(render_thumbnail(
+                    image, CARD_GEOMETRIES[0], extension
+                ))
+                self.assertEqual(
+                    thumbnail.mode,
+                    'RGB' if extension == 'jpg' else 'RGBA'
+                )
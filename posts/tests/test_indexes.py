@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+USERNAME_1 = 'Smirnov'
+USERNAME_2 = 'Ivanov'
+SLUG = 'leo'
+
+
+def query_plan(queryset):
+    """Возвращает план выполнения запроса.
+    В PostgreSQL сортировка и полный просмотр запрещаются, чтобы
+    на маленькой тестовой таблице планировщик выбрал индекс, если он есть"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+    return queryset.explain()
+
+
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username=USERNAME_1)
+        cls.reader = get_user_model().objects.create_user(username=USERNAME_2)
+        cls.group = Group.objects.create(
+            title='Заголовок', description='Описание', slug=SLUG
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Текст', group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(FeedIndexesTests.reader)
+
+    def assertUsesIndexWithoutSort(self, queryset):
+        plan = query_plan(queryset)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertIn('INDEX', plan)
+        elif connection.vendor == 'postgresql':
+            self.assertNotIn('Sort', plan)
+            self.assertIn('Index', plan)
+        else:
+            self.skipTest(f'Нет проверки планов для {connection.vendor}')
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают посты по индексу без сортировки"""
+        feed_urls = {
+            'index': reverse('index'),
+            'group_posts': reverse('group_posts', kwargs={'slug': SLUG}),
+            'profile': reverse('profile', kwargs={'username': USERNAME_1}),
+            'follow_index': reverse('follow_index'),
+        }
+        for name, url in feed_urls.items():
+            with self.subTest(view=name):
+                response = self.client.get(url)
+                page = response.context.get('page')
+                paginator = response.context.get('paginator')
+                self.assertUsesIndexWithoutSort(paginator.page_queryset())
+                self.assertUsesIndexWithoutSort(paginator.page_queryset(
+                    ('n', page.rows[0].pub_date, page.rows[0].pk, 2)
+                ))
+
+    def test_post_comments_query_uses_index(self):
+        """Комментарии поста читаются по индексу без сортировки"""
+        response = self.client.get(reverse('post', kwargs={
+            'username': USERNAME_1, 'post_id': FeedIndexesTests.post.pk
+        }))
+        self.assertUsesIndexWithoutSort(response.context.get('comments'))
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+
+from yatube.storage import StaticStorage
+
+
+CONTENT = bytes(range(256)) * 4
+IMAGE_URL = '/media/posts/image.gif'
+THUMBNAIL_URL = '/media/thumbs/ab/ab_960x339.jpg'
+
+
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        for name in ('posts/image.gif', 'thumbs/ab/ab_960x339.jpg'):
+            path = os.path.join(cls.media_root, name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as media_file:
+                media_file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_whole_file(self):
+        response = self.guest_client.get(IMAGE_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_ranges(self):
+        size = len(CONTENT)
+        cases = (
+            ('bytes=0-9', CONTENT[:10], f'bytes 0-9/{size}'),
+            ('bytes=1000-', CONTENT[1000:], f'bytes 1000-{size - 1}/{size}'),
+            ('bytes=-5', CONTENT[-5:], f'bytes {size - 5}-{size - 1}/{size}'),
+        )
+        for header, content, content_range in cases:
+            with self.subTest(header=header):
+                response = self.guest_client.get(
+                    IMAGE_URL, HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b''.join(response.streaming_content), content
+                )
+                self.assertEqual(response['Content-Range'], content_range)
+
+    def test_unsatisfiable_range(self):
+        response = self.guest_client.get(IMAGE_URL, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(
+            response['Content-Range'], f'bytes */{len(CONTENT)}'
+        )
+
+    def test_not_modified(self):
+        last_modified = self.guest_client.get(IMAGE_URL)['Last-Modified']
+        response = self.guest_client.get(
+            IMAGE_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_thumbnails_immutable(self):
+        response = self.guest_client.get(THUMBNAIL_URL)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_missing_and_outside_files(self):
+        for url, status in (
+            ('/media/posts/missing.gif', 404), ('/media/../manage.py', 400)
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(url).status_code, status
+                )
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected/')
+    def test_accel_redirect(self):
+        response = self.guest_client.get(IMAGE_URL)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected/posts/image.gif'
+        )
+        self.assertEqual(response.content, b'')
+
+
+class StaticStorageTests(TestCase):
+    def test_missing_file_falls_back_to_plain_url(self):
+        storage = StaticStorage(location=tempfile.gettempdir())
+        with override_settings(DEBUG=False):
+            self.assertEqual(
+                storage.url('bootstrap/app.css'), '/static/bootstrap/app.css'
+            )
@@ -0,0 +1,116 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from yatube.metrics import VIEW_METRICS, assert_query_budget
+
+
+USERNAME_1 = 'Smirnov'
+USERNAME_2 = 'Ivanov'
+SLUG = 'leo'
+METRICS_URL = reverse('metrics')
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username=USERNAME_1)
+        cls.reader = get_user_model().objects.create_user(username=USERNAME_2)
+        cls.group = Group.objects.create(
+            title='Заголовок', description='Описание', slug=SLUG
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_pages_within_query_budget(self):
+        """Число запросов страниц не зависит от числа постов на них"""
+        budgets = (
+            (reverse('index'), 3),
+            (reverse('group_posts', args=[SLUG]), 4),
+            (reverse('profile', args=[USERNAME_1]), 5),
+            (reverse('post', args=[USERNAME_1, self.post.pk]), 4),
+            (reverse('follow_index'), 4),
+            (reverse('search') + '?q=пост', 5),
+        )
+        for url, budget in budgets:
+            with self.subTest(url=url), assert_query_budget(budget):
+                self.assertEqual(self.reader_client.get(url).status_code, 200)
+
+    def test_budget_exceeded_lists_queries(self):
+        with self.assertRaisesMessage(AssertionError, 'SELECT'):
+            with assert_query_budget(0):
+                self.reader_client.get(reverse('index'))
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        VIEW_METRICS.reset()
+        self.guest_client = Client()
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.guest_client.get(reverse('index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ SQL", tpl;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_only_for_staff(self):
+        """Без SERVER_TIMING заголовок не выдаёт устройство сайта
+        посетителям, но остаётся у сотрудников"""
+        response = self.guest_client.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
+        staff_client = Client()
+        staff_client.force_login(get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        ))
+        self.assertIn('Server-Timing', staff_client.get(reverse('index')))
+
+    def test_metrics_aggregated_by_view(self):
+        self.guest_client.get(reverse('index'))
+        self.guest_client.get(reverse('index'))
+        stats = VIEW_METRICS.snapshot()['index']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['template_time'], 0)
+
+    @override_settings(QUERY_BUDGET=0)
+    def test_over_budget_logged(self):
+        with self.assertLogs('yatube.metrics', 'WARNING'):
+            self.guest_client.get(reverse('index'))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_access(self):
+        self.guest_client.get(reverse('index'))
+        self.assertEqual(self.guest_client.get(METRICS_URL).status_code, 404)
+        staff_client = Client()
+        staff_client.force_login(get_user_model().objects.create_user(
+            username='admin', is_staff=True
+        ))
+        for client, headers in (
+            (staff_client, {}),
+            (self.guest_client, {'HTTP_AUTHORIZATION': 'Bearer secret'}),
+        ):
+            response = client.get(METRICS_URL, **headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(re.search(
+                r'^yatube_view_requests_total\{view="index"\} \d+$',
+                response.content.decode(), re.MULTILINE
+            ))
@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Group, Post
+from posts.models import Comment, Group, Post
 
 
 USERNAME_1 = 'Smirnov'
@@ -54,3 +59,44 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_name = group.title
         self.assertEqual(expected_name, str(group))
+
+    def test_comment_count_follows_comments(self):
+        """Счётчик комментариев поста меняется
+        при добавлении и удалении комментария"""
+        post = PostModelTest.post
+        comment = Comment.objects.create(
+            post=post, author=post.author, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_recount_comments_repairs_drift(self):
+        """Команда recount_comments исправляет рассинхронизацию счётчика"""
+        post = PostModelTest.post
+        Comment.objects.create(
+            post=post, author=post.author, text='Комментарий'
+        )
+        Post.objects.filter(pk=post.pk).update(comment_count=42)
+        call_command('recount_comments', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_post_delete_cost_does_not_grow_with_comments(self):
+        """Каскадно удаляемые комментарии не пересчитывают счётчик
+        и поисковый индекс удаляемого поста"""
+        def delete_cost(comments):
+            post = Post.objects.create(
+                author=PostModelTest.post.author, text='Удаляемый'
+            )
+            Comment.objects.bulk_create(
+                Comment(post=post, author=post.author, text='Комментарий')
+                for _ in range(comments)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(delete_cost(5), delete_cost(50))
@@ -38,3 +38,36 @@ class PaginatorViewsTest(TestCase):
         response = self.guest_client.get(INDEX_URL + '?page=2')
         page_2 = response.context.get('paginator').get_page(2)
         self.assertEqual(page_2.object_list.count(), 3)
+
+    def test_next_cursor_leads_to_remaining_records(self):
+        """По курсору следующей страницы выводятся
+        оставшиеся посты без повторов"""
+        page_1 = self.guest_client.get(INDEX_URL).context.get('page')
+        response = self.guest_client.get(
+            INDEX_URL, {'cursor': page_1.next_cursor}
+        )
+        page_2 = response.context.get('page')
+        self.assertEqual(len(page_2), 3)
+        self.assertEqual(page_2.number, 2)
+        self.assertFalse(page_2.has_next())
+        self.assertFalse(set(page_1) & set(page_2))
+
+    def test_previous_cursor_returns_first_page(self):
+        """Курсор предыдущей страницы возвращает первую страницу"""
+        page_1 = self.guest_client.get(INDEX_URL).context.get('page')
+        page_2 = self.guest_client.get(
+            INDEX_URL, {'cursor': page_1.next_cursor}
+        ).context.get('page')
+        response = self.guest_client.get(
+            INDEX_URL, {'cursor': page_2.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context.get('page')), list(page_1)
+        )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Повреждённый курсор ведёт на первую страницу"""
+        response = self.guest_client.get(INDEX_URL, {'cursor': 'broken!'})
+        page = response.context.get('page')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page), 10)
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.paginator import POSTS_PER_PAGE
+from posts.search import SearchResults, index_post
+from posts.stemmer import stem
+
+
+USERNAME = 'Smirnov'
+SEARCH_URL = reverse('search')
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        for forms in (
+            ('книга', 'книги', 'книгами', 'книгу'),
+            ('толстой', 'толстого', 'толстому'),
+            ('читать', 'читал', 'читали'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username=USERNAME)
+        cls.post = Post.objects.create(
+            author=cls.user, text='Поделился любимыми книгами'
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text='Сегодня была хорошая погода'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query):
+        return list(SearchResults(query)[:POSTS_PER_PAGE])
+
+    def test_search_matches_word_forms(self):
+        self.assertEqual(self.found('книга'), [self.post])
+        self.assertEqual(SearchResults('любимая книга').count(), 1)
+
+    def test_search_finds_comment_text(self):
+        Comment.objects.create(
+            post=self.other, author=self.user, text='Гуляли в парке'
+        )
+        self.assertEqual(self.found('парк'), [self.other])
+
+    def test_index_follows_edit_and_delete(self):
+        post = Post.objects.create(author=self.user, text='Про погоду')
+        post.text = 'Про книгу'
+        post.save()
+        self.assertEqual(SearchResults('книга').count(), 2)
+        post.delete()
+        self.assertEqual(self.found('книга'), [self.post])
+
+    def test_empty_and_syntax_queries(self):
+        for query in ('', '   ', '"', 'AND OR *', 'книга"'):
+            with self.subTest(query=query):
+                self.found(query)
+        self.assertEqual(SearchResults('').count(), 0)
+
+    def test_results_ranked_by_relevance(self):
+        best = Post.objects.create(
+            author=self.user, text='Книги, книги и снова книги'
+        )
+        self.assertEqual(self.found('книги')[0], best)
+
+    def test_search_page_paginated(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Заметка номер {i}')
+            for i in range(POSTS_PER_PAGE + 2)
+        )
+        # bulk_create не вызывает сигналы, поэтому посты индексируются явно
+        for post_id in Post.objects.filter(
+            text__startswith='Заметка'
+        ).values_list('pk', flat=True):
+            index_post(post_id)
+        response = self.guest_client.get(SEARCH_URL, {'q': 'заметки'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count,
+                         POSTS_PER_PAGE + 2)
+        self.assertEqual(len(response.context['page']), POSTS_PER_PAGE)
+        response = self.guest_client.get(
+            SEARCH_URL, {'q': 'заметки', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page']), 2)
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from posts.counters import count_user_stats
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import SearchResults
+
+
+class SeedDataTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', users=30, groups=4, posts=300, comments=500,
+            follows=80, batch_size=100, seed=1, stdout=StringIO()
+        )
+
+    def test_counts(self):
+        """Создано заданное количество объектов без подписок на себя"""
+        self.assertEqual(Group.objects.count(), 4)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 500)
+        self.assertEqual(Follow.objects.count(), 80)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+
+    def test_dates_spread(self):
+        """Даты публикации распределены, комментарии пишутся после поста"""
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+        post = Post.objects.order_by('pub_date').first()
+        self.assertEqual(post.updated, post.pub_date)
+        for comment in Comment.objects.select_related('post')[:50]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_derived_data(self):
+        """Счётчики, ленты подписок и поисковый индекс согласованы"""
+        post = Post.objects.order_by('-comment_count').first()
+        self.assertEqual(post.comment_count, post.comments.count())
+        author = post.author
+        for field, value in count_user_stats(author.pk).items():
+            self.assertEqual(getattr(author.stats, field), value)
+        follow = Follow.objects.annotate(
+            total=Count('author__posts')
+        ).filter(total__gt=0).first()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user_id=follow.user_id, author_id=follow.author_id
+        ).exists())
+        results = SearchResults(post.text.split()[0])
+        if results.backend is not None:
+            self.assertGreater(results.count(), 0)
+
+    def test_bench_feeds_baseline(self):
+        """Замер сохраняется как базовый, а ухудшение приводит к ошибке"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feeds.json')
+            call_command(
+                'bench_feeds', requests=2, pages=2, save_baseline=path,
+                stdout=StringIO()
+            )
+            with open(path) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.assertEqual(
+                set(baseline['views']),
+                {'index', 'group_posts', 'profile', 'post', 'follow_index'}
+            )
+            call_command(
+                'bench_feeds', requests=2, pages=2, baseline=path,
+                tolerance=1000, stdout=StringIO()
+            )
+            baseline['views']['index']['queries'] = 0
+            with open(path, 'w') as baseline_file:
+                json.dump(baseline, baseline_file)
+            with self.assertRaisesMessage(CommandError, 'index: queries'):
+                call_command(
+                    'bench_feeds', requests=2, pages=2, baseline=path,
+                    tolerance=1000, stdout=StringIO()
+                )
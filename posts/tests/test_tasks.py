@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Post, Task
+from posts.tasks import MAX_ATTEMPTS, enqueue, queue_depth, run_pending, task
+from posts.views import index_context
+
+
+CALLS = []
+
+
+@task
+def remember_args(*args):
+    CALLS.append(args)
+
+
+@task
+def always_fails():
+    raise ValueError('Ошибка задачи')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_task_runs_and_leaves_queue(self):
+        """Выполненная задача удаляется из очереди"""
+        enqueue('remember_args', 1, 'два')
+        self.assertEqual(queue_depth()[Task.PENDING], 1)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, [(1, 'два')])
+        self.assertFalse(Task.objects.exists())
+
+    def test_delayed_task_waits(self):
+        """Отложенная задача не выполняется раньше срока"""
+        enqueue('remember_args', delay=60)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(CALLS, [])
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        """Упавшая задача повторяется, а после исчерпания
+        попыток помечается ошибкой"""
+        queued = enqueue('always_fails')
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            Task.objects.filter(pk=queued.pk).update(run_at=queued.created)
+            run_pending()
+            queued.refresh_from_db()
+            self.assertEqual(queued.attempts, attempt)
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertIn('Ошибка задачи', queued.last_error)
+
+    def test_unknown_task_is_rejected(self):
+        """Нельзя поставить в очередь незарегистрированную задачу"""
+        with self.assertRaises(KeyError):
+            enqueue('no_such_task')
+
+    def test_stats_command_shows_queue_depth(self):
+        """Команда run_tasks --stats показывает размер очереди"""
+        enqueue('remember_args')
+        out = StringIO()
+        call_command('run_tasks', '--stats', stdout=out)
+        self.assertIn(f'{Task.PENDING}: 1', out.getvalue())
+
+    def test_unique_task_is_not_duplicated(self):
+        """Задача с unique=True не ставится повторно, пока такая же ждёт"""
+        first = enqueue('remember_args', 1, unique=True)
+        self.assertEqual(enqueue('remember_args', 1, unique=True), first)
+        enqueue('remember_args', 2, unique=True)
+        self.assertEqual(queue_depth()[Task.PENDING], 2)
+        run_pending()
+        enqueue('remember_args', 1, unique=True)
+        self.assertEqual(queue_depth()[Task.PENDING], 1)
+
+
+class BuiltinTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='Smirnov')
+        cls.post = Post.objects.create(author=cls.user, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_index_cache_fills_anonymous_fragment(self):
+        """Прогрев заполняет тот же фрагмент, что читает главная
+        страница анонимного посетителя"""
+        key = make_template_fragment_key(
+            'index_page', [index_context()['page_signature'], None]
+        )
+        enqueue('warm_index_cache')
+        run_pending()
+        self.assertIn(self.post.text, cache.get(key))
+
+    def test_queued_recount_repairs_counters(self):
+        """Пересчёт счётчиков, поставленный командой в очередь,
+        исправляет расхождения"""
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        for command in ('recount_comments', 'recount_user_stats'):
+            call_command(command, '--queue', stdout=StringIO())
+        self.assertEqual(queue_depth()[Task.PENDING], 2)
+        run_pending()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertFalse(Task.objects.exists())
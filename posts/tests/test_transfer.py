@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leo = User.objects.create_user(username='leo', password='pass')
+        cls.sofia = User.objects.create_user(username='sofia')
+        cls.group = Group.objects.create(
+            title='Дневник', slug='diary', description='Записи'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.leo, group=cls.group if number % 2 else None,
+                text=f'Запись номер {number}'
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.sofia, text='Ответ'
+        )
+        Follow.objects.create(user=cls.sofia, author=cls.leo)
+
+    def export(self, *args):
+        output = StringIO()
+        call_command('export_data', *args, stdout=output, stderr=StringIO())
+        return output.getvalue()
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('username').values_list(
+                'username', 'password', 'date_joined'
+            )),
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'author__username', 'group__slug', 'text', 'pub_date',
+                'updated'
+            )),
+            list(Comment.objects.values_list(
+                'pk', 'post_id', 'author__username', 'created'
+            )),
+            list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_export_lines(self):
+        """Каждая строка выгрузки — объект JSON, модели идут по порядку"""
+        lines = self.export('--chunk-size', '2').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2 + 1 + 5 + 1 + 1)
+        self.assertEqual(
+            [row['model'] for row in rows[:3]],
+            ['auth.user', 'auth.user', 'posts.group']
+        )
+        self.assertEqual(
+            {row['pk'] for row in rows if row['model'] == 'posts.post'},
+            {post.pk for post in self.posts}
+        )
+        self.assertEqual(rows[-1], {
+            'model': 'posts.follow', 'user': 'sofia', 'author': 'leo'
+        })
+
+    def test_round_trip(self):
+        """Загрузка выгрузки в пустую базу восстанавливает данные,
+        даты и ключи, а также счётчики и ленты подписок"""
+        expected = self.snapshot()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.jsonl.gz')
+            call_command('export_data', path, stderr=StringIO())
+            for model in (Follow, Comment, Post, Group, User):
+                model.objects.all().delete()
+            call_command(
+                'import_data', path, '--batch-size', '2', stdout=StringIO(),
+                stderr=StringIO()
+            )
+            self.assertEqual(self.snapshot(), expected)
+            # Повторная загрузка не создаёт дубликатов
+            call_command(
+                'import_data', path, stdout=StringIO(), stderr=StringIO()
+            )
+        self.assertEqual(self.snapshot(), expected)
+        leo = User.objects.get(username='leo')
+        self.assertTrue(leo.check_password('pass'))
+        self.assertEqual(leo.stats.followers_count, 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).comment_count, 1
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__username='sofia').count(), 5
+        )
+
+    def test_import_skips_dangling_references(self):
+        """Строки со ссылками на отсутствующие записи пропускаются"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.jsonl')
+            with open(path, 'w') as dump:
+                dump.write(json.dumps({
+                    'model': 'posts.comment', 'pk': 1000, 'post': 999,
+                    'author': 'leo', 'text': 'Ответ',
+                    'created': '2020-01-01T00:00:00+00:00',
+                }) + '\n')
+                dump.write(json.dumps({
+                    'model': 'posts.follow', 'user': 'leo',
+                    'author': 'nobody',
+                }) + '\n')
+            output = StringIO()
+            call_command('import_data', path, stdout=output)
+        self.assertIn('posts.comment: загружено 0, пропущено 1',
+                      output.getvalue())
+        self.assertFalse(Comment.objects.filter(pk=1000).exists())
+
+    def test_unknown_model(self):
+        with self.assertRaisesMessage(CommandError, 'posts.like'):
+            self.export('--models', 'posts.like')
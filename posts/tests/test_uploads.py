@@ -0,0 +1,159 @@
+import os
+import shutil
+import struct
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.uploads import MAX_IMAGE_SIDE
+
+
+USERNAME = 'Smirnov'
+POST_NEW_URL = reverse('post_new')
+ORIENTATION = 0x0112
+
+
+def make_image(size, image_format='JPEG', orientation=None):
+    image = Image.new('RGB', size, (200, 30, 30))
+    output = BytesIO()
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        options['exif'] = exif.tobytes()
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def make_transparent(image_format):
+    """Изображение с палитрой, где нулевой цвет прозрачный"""
+    image = Image.new('P', (30, 20), 0)
+    image.putpalette([255, 0, 0, 0, 255, 0] + [0] * 762)
+    image.paste(1, (0, 0, 10, 10))
+    output = BytesIO()
+    image.save(output, format=image_format, transparency=0)
+    return output.getvalue()
+
+
+def make_mpo(size):
+    """Снимок телефона: два JPEG-кадра и блок MPF в первом из них"""
+    first, second = make_image(size), make_image(size)
+    entries_offset = 8 + 2 + 3 * 12 + 4
+    length = 2 + 4 + entries_offset + 2 * 16
+    first_size = len(first) + 2 + length
+    header = b'MM\x00\x2a' + struct.pack('>LH', 8, 3)
+    header += struct.pack('>HHL4s', 0xB000, 7, 4, b'0100')
+    header += struct.pack('>HHLL', 0xB001, 4, 1, 2)
+    header += struct.pack('>HHLL', 0xB002, 7, 32, entries_offset)
+    header += struct.pack('>L', 0)
+    header += struct.pack('>LLLHH', 0x20030000, first_size, 0, 0, 0)
+    # Смещение второго кадра отсчитывается от заголовка MPF
+    header += struct.pack(
+        '>LLLHH', 0x00020002, len(second), first_size - 10, 0, 0
+    )
+    segment = b'\xff\xe2' + struct.pack('>H', length) + b'MPF\x00' + header
+    return first[:2] + segment + first[2:] + second
+
+
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.user = get_user_model().objects.create_user(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, content, name='photo.jpg', text='С фото'):
+        return self.authorized_client.post(POST_NEW_URL, data={
+            'text': text,
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    def test_large_photo_downsized_and_stripped(self):
+        self.upload(make_image((4000, 3000), orientation=6))
+        post = Post.objects.get(text='С фото')
+        with post.image.open('rb') as image_file:
+            image = Image.open(image_file)
+            # Поворот из EXIF применён к пикселям, сами метаданные удалены
+            self.assertEqual(image.size, (MAX_IMAGE_SIDE * 3 // 4,
+                                          MAX_IMAGE_SIDE))
+            self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_identical_uploads_stored_once(self):
+        content = make_image((100, 80))
+        self.upload(content, name='first.jpg', text='Первый')
+        self.upload(content, name='second.jpg', text='Второй')
+        first = Post.objects.get(text='Первый')
+        second = Post.objects.get(text='Второй')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            len(os.listdir(os.path.join(settings.MEDIA_ROOT, 'posts'))), 1
+        )
+
+    def test_rejected_uploads(self):
+        cases = (
+            ('posts.uploads.MAX_UPLOAD_SIZE', 1024,
+             make_image((800, 600)), 'МБ'),
+            ('posts.uploads.MAX_IMAGE_PIXELS', 100,
+             make_image((20, 20)), 'мегапикселей'),
+        )
+        for limit, value, content, message in cases:
+            with self.subTest(limit=limit), mock.patch(limit, value):
+                response = self.upload(content)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(
+                    message, response.context['form'].errors['image'][0]
+                )
+        self.assertFalse(Post.objects.filter(text='С фото').exists())
+
+    def test_truncated_upload_rejected(self):
+        content = make_image((400, 300))
+        response = self.upload(content[:len(content) // 2])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'повреждён', response.context['form'].errors['image'][0]
+        )
+        self.assertFalse(Post.objects.filter(text='С фото').exists())
+
+    def test_unsupported_format_rejected(self):
+        response = self.upload(make_image((20, 20), 'BMP'), name='a.bmp')
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_transparency_kept(self):
+        for image_format in ('PNG', 'GIF'):
+            with self.subTest(image_format=image_format):
+                text = f'Прозрачный {image_format}'
+                self.upload(make_transparent(image_format),
+                            name=f'a.{image_format.lower()}', text=text)
+                post = Post.objects.get(text=text)
+                with post.image.open('rb') as image_file:
+                    image = Image.open(image_file)
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.info.get('transparency'), 0)
+
+    def test_phone_mpo_saved_as_jpeg(self):
+        content = make_mpo((40, 30))
+        self.assertEqual(Image.open(BytesIO(content)).format, 'MPO')
+        self.upload(content)
+        post = Post.objects.get(text='С фото')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with post.image.open('rb') as image_file:
+            image = Image.open(image_file)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (40, 30))
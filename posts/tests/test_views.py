@@ -1,14 +1,21 @@
 import shutil
 import tempfile
+import time
 
 from django.conf import settings
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext
 from django.test import Client, TestCase
 from django.urls import reverse
+from django.utils.http import http_date
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post
 
 
 USERNAME_1 = 'Smirnov'
@@ -155,12 +162,182 @@ class PostViewsTests(TestCase):
 
     def test_cache_function_in_page_index(self):
         """Кэширование страницы index работает исправно."""
-        response_1 = self.authorized_client.get(INDEX_URL)
-        Post.objects.create(
+        response = self.authorized_client.get(INDEX_URL)
+        key = make_template_fragment_key('index_page', [
+            response.context.get('page_signature'), PostViewsTests.user.pk
+        ])
+        self.assertIsNotNone(cache.get(key))
+
+    def test_post_item_fragment_is_cached_per_post_version(self):
+        """Карточка поста кэшируется по id и версии поста."""
+        self.guest_client.get(PROFILE_URL)
+        post = Post.objects.get(pk=PostViewsTests.post.pk)
+        key = make_template_fragment_key(
+            'post_item', [post.pk, post.updated.timestamp()]
+        )
+        self.assertIn(post.text, cache.get(key))
+
+    def test_index_cache_does_not_serve_stale_posts(self):
+        """Новые и изменённые посты сразу видны на странице index."""
+        self.authorized_client.get(INDEX_URL)
+        new_post = Post.objects.create(
             author=PostViewsTests.user,
             text='Текст new',
-            group=PostViewsTests.group,
-            image=PostViewsTests.uploaded
+            group=PostViewsTests.group
+        )
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertContains(response, 'Текст new')
+        new_post.text = 'Текст edited'
+        new_post.save()
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertContains(response, 'Текст edited')
+
+
+class GroupPostsScalingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username=USERNAME_1)
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug=SLUG
+        )
+
+    def add_posts(self, count):
+        Post.objects.bulk_create([
+            Post(author=GroupPostsScalingTests.user, text='Текст',
+                 group=GroupPostsScalingTests.group)
+            for _ in range(count)
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=post, author=GroupPostsScalingTests.user,
+                    text='Комментарий')
+            for post in Post.objects.filter(comments=None)
+        ])
+
+    def measure_group_page(self):
+        """Возвращает число запросов и загруженных объектов моделей"""
+        loaded = []
+
+        def count_instance(sender, **kwargs):
+            loaded.append(sender)
+
+        post_init.connect(count_instance)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(GROUP_URL)
+        finally:
+            post_init.disconnect(count_instance)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(loaded)
+
+    def test_group_page_cost_does_not_grow_with_group(self):
+        """Число запросов и строк на странице сообщества
+        не зависит от размера сообщества"""
+        self.add_posts(15)
+        small_group_cost = self.measure_group_page()
+        self.add_posts(150)
+        large_group_cost = self.measure_group_page()
+        self.assertEqual(small_group_cost, large_group_cost)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username=USERNAME_1)
+        cls.reader = get_user_model().objects.create_user(username='Ivanov')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            description='Описание',
+            slug=SLUG
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group
+        )
+        cls.post_url = reverse('post', args=[USERNAME_1, cls.post.pk])
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def revalidate(self, url, client=None):
+        """Повторяет запрос с ETag из первого ответа"""
+        client = client or self.guest_client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_not_modified(self):
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL, self.post_url):
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertIn('ETag', response)
+
+    def test_if_modified_since_alone_not_answered_with_304(self):
+        """Last-Modified не отправляется, поэтому запрос только
+        с If-Modified-Since после подписки или удаления поста
+        получает свежую страницу"""
+        newest = Post.objects.create(author=self.user, text='Новейший')
+        changes = (
+            (PROFILE_URL, lambda: Follow.objects.create(
+                user=self.reader, author=self.user
+            )),
+            (INDEX_URL, lambda: newest.delete()),
+        )
+        since = http_date(time.time() + 60)
+        for url, change in changes:
+            with self.subTest(url=url):
+                self.assertNotIn('Last-Modified', self.guest_client.get(url))
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=since
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_page_rerendered_without_csrf_cookie(self):
+        """Страница с формой комментария отрисовывается заново,
+        если у пользователя нет CSRF-cookie, и выставляет его"""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(self.post_url)
+        etag = client.get(self.post_url)['ETag']
+        self.assertEqual(
+            client.get(self.post_url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304
+        )
+        del client.cookies[settings.CSRF_COOKIE_NAME]
+        response = client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_changes_invalidate_etag(self):
+        changes = (
+            (INDEX_URL, lambda: Post.objects.create(
+                author=self.user, text='Новый пост'
+            )),
+            (self.post_url, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )),
+            (PROFILE_URL, lambda: Follow.objects.create(
+                user=self.reader, author=self.user
+            )),
+            (GROUP_URL, lambda: Post.objects.filter(pk=self.post.pk).delete()),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_between_users(self):
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        self.assertNotEqual(
+            self.guest_client.get(INDEX_URL)['ETag'],
+            reader_client.get(INDEX_URL)['ETag']
         )
-        response_2 = self.authorized_client.get(INDEX_URL)
-        self.assertHTMLEqual(str(response_1.content), str(response_2.content))
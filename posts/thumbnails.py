@@ -0,0 +1,141 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+
+# Размеры миниатюр, которые выводятся в шаблонах.
+# Карточка поста выводится в нескольких ширинах с одинаковыми пропорциями
+CARD_GEOMETRY = (960, 339)
+CARD_WIDTHS = (480, 960, 1440)
+CARD_GEOMETRIES = tuple(
+    (width, round(width * CARD_GEOMETRY[1] / CARD_GEOMETRY[0]))
+    for width in CARD_WIDTHS
+)
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+GEOMETRIES = CARD_GEOMETRIES
+
+# Форматы в порядке предпочтения: расширение, формат Pillow,
+# тип содержимого и параметры сохранения. JPEG нужен всегда
+# как запасной вариант для старых браузеров
+FORMATS = (
+    ('avif', 'AVIF', 'image/avif', {'quality': 60}),
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 85, 'optimize': True}),
+)
+FALLBACK_EXTENSION = 'jpg'
+
+
+def available_formats():
+    """Функция отбора форматов, которые умеет сохранять установленный Pillow"""
+    Image.init()
+    return [
+        (extension, content_type)
+        for extension, pillow_format, content_type, _ in FORMATS
+        if pillow_format in Image.SAVE
+    ]
+
+
+def thumbnail_name(content_hash, geometry, extension=FALLBACK_EXTENSION):
+    """Функция построения пути миниатюры по хэшу содержимого"""
+    width, height = geometry
+    return (
+        f'thumbs/{content_hash[:2]}/'
+        f'{content_hash}_{width}x{height}.{extension}'
+    )
+
+
+def thumbnail_url(content_hash, geometry, extension=FALLBACK_EXTENSION):
+    """Функция получения адреса готовой миниатюры без обращения к диску"""
+    return default_storage.url(
+        thumbnail_name(content_hash, geometry, extension)
+    )
+
+
+def card_sources(content_hash):
+    """Функция построения srcset карточки для каждого формата.
+    Возвращает пары (тип содержимого, srcset) в порядке предпочтения"""
+    return [
+        (content_type, ', '.join(
+            f'{thumbnail_url(content_hash, (width, height), extension)} '
+            f'{width}w'
+            for width, height in CARD_GEOMETRIES
+        ))
+        for extension, content_type in available_formats()
+    ]
+
+
+def hash_file(field_file):
+    """Функция подсчёта sha256 содержимого файла по частям"""
+    digest = hashlib.sha256()
+    with field_file.open('rb') as image_file:
+        for chunk in image_file.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_mode(image, extension=FALLBACK_EXTENSION):
+    """Функция выбора режима миниатюры. Прозрачные изображения
+    остаются прозрачными во всех форматах, кроме JPEG"""
+    if extension != FALLBACK_EXTENSION and (
+        image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    ):
+        return 'RGBA'
+    return 'RGB'
+
+
+def render_thumbnail(image, geometry, extension=FALLBACK_EXTENSION):
+    """Функция обрезки изображения по центру и приведения к размеру"""
+    pillow_format, options = next(
+        (pillow_format, options)
+        for name, pillow_format, _, options in FORMATS if name == extension
+    )
+    # Режим меняется до масштабирования: изображение с палитрой
+    # иначе уменьшалось бы без сглаживания
+    mode = thumbnail_mode(image, extension)
+    if image.mode != mode:
+        image = image.convert(mode)
+    thumbnail = ImageOps.fit(
+        image, geometry, method=Image.LANCZOS, centering=(0.5, 0.5)
+    )
+    output = BytesIO()
+    thumbnail.save(output, format=pillow_format, **options)
+    return ContentFile(output.getvalue())
+
+
+def generate_thumbnails(post_id):
+    """Функция создания всех миниатюр изображения поста.
+    Одинаковые изображения разных постов используют общие файлы,
+    уже созданные миниатюры не пересоздаются"""
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return None
+    image_name = post.image.name
+    content_hash = hash_file(post.image)
+    missing = [
+        (geometry, extension)
+        for geometry in GEOMETRIES
+        for extension, _ in available_formats()
+        if not default_storage.exists(
+            thumbnail_name(content_hash, geometry, extension)
+        )
+    ]
+    if missing:
+        with post.image.open('rb') as image_file:
+            image = Image.open(image_file)
+            image.load()
+        for geometry, extension in missing:
+            default_storage.save(
+                thumbnail_name(content_hash, geometry, extension),
+                render_thumbnail(image, geometry, extension)
+            )
+    # Изображение могли заменить, пока строились миниатюры
+    Post.objects.filter(pk=post_id, image=image_name).update(
+        image_hash=content_hash, updated=timezone.now()
+    )
+    return content_hash
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db.models import Max
+
+from .counters import get_user_stats
+from .models import Follow, Post, TimelineEntry
+
+
+# Посты авторов с большим числом подписчиков не раскладываются по лентам
+# при публикации: читатель сам подтягивает их в свою ленту при просмотре
+FANOUT_LIMIT = 1000
+# Ленты небольшого числа подписчиков заполняются прямо в запросе
+INLINE_FANOUT_LIMIT = 100
+BACKFILL_SIZE = 200
+BATCH_SIZE = 500
+# Как часто лента читателя догоняет посты крупных авторов, в секундах
+PULL_INTERVAL = 60
+
+
+def timeline_entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id, post_id=post.pk,
+        author_id=post.author_id, pub_date=post.pub_date
+    )
+
+
+def is_fanout_author(author):
+    """Функция проверки, раскладываются ли посты автора по лентам"""
+    return get_user_stats(author).followers_count <= FANOUT_LIMIT
+
+
+def fan_out_post(post):
+    """Функция раскладки нового поста по лентам подписчиков автора"""
+    if not is_fanout_author(post.author):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [timeline_entry(user_id, post)
+         for user_id in follower_ids.iterator()],
+        batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_posts(author, posts):
+    """Функция раскладки нескольких новых постов автора по лентам
+    подписчиков: подписчики читаются один раз на все посты"""
+    if not posts or not is_fanout_author(author):
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=author.pk
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        [timeline_entry(user_id, post)
+         for post in posts for user_id in follower_ids],
+        batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def backfill_timeline(user_id, author, since=None):
+    """Функция добавления последних постов автора в ленту подписчика"""
+    posts = Post.objects.filter(author_id=author.pk)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    posts = posts.only('pk', 'author_id', 'pub_date')[:BACKFILL_SIZE]
+    TimelineEntry.objects.bulk_create(
+        [timeline_entry(user_id, post) for post in posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def trim_timeline(user_id, author_id):
+    """Функция удаления постов автора из ленты бывшего подписчика"""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull_large_authors(user):
+    """Функция чтения при просмотре: новые посты крупных авторов
+    из подписок добавляются в ленту читателя"""
+    if not cache.add(f'timeline:pulled:{user.pk}', True, PULL_INTERVAL):
+        return
+    follows = Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=FANOUT_LIMIT
+    ).select_related('author')
+    for follow in follows:
+        latest = TimelineEntry.objects.filter(
+            user=user, author_id=follow.author_id
+        ).aggregate(latest=Max('pub_date'))['latest']
+        backfill_timeline(user.pk, follow.author, since=latest)
+
+
+def timeline_entries(user):
+    """Функция получения записей ленты подписок пользователя"""
+    pull_large_authors(user)
+    return TimelineEntry.objects.filter(user=user)
@@ -0,0 +1,196 @@
+import gzip
+import json
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .bulk import explicit_dates
+from .models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+# Модели в порядке выгрузки: каждая ссылается только на предыдущие.
+# Для каждой указаны имена полей в файле и откуда они берутся.
+# Пользователи и группы связываются по username и slug, посты
+# и комментарии сохраняют первичные ключи, чтобы не менялись адреса
+EXPORT_FIELDS = {
+    'auth.user': (User, {
+        'username': 'username', 'password': 'password',
+        'first_name': 'first_name', 'last_name': 'last_name',
+        'email': 'email', 'is_active': 'is_active', 'is_staff': 'is_staff',
+        'is_superuser': 'is_superuser', 'last_login': 'last_login',
+        'date_joined': 'date_joined',
+    }),
+    'posts.group': (Group, {
+        'slug': 'slug', 'title': 'title', 'description': 'description',
+    }),
+    'posts.post': (Post, {
+        'pk': 'pk', 'author': 'author__username', 'group': 'group__slug',
+        'text': 'text', 'pub_date': 'pub_date', 'updated': 'updated',
+        'image': 'image', 'image_hash': 'image_hash',
+    }),
+    'posts.comment': (Comment, {
+        'pk': 'pk', 'post': 'post_id', 'author': 'author__username',
+        'text': 'text', 'created': 'created',
+    }),
+    'posts.follow': (Follow, {
+        'user': 'user__username', 'author': 'author__username',
+    }),
+}
+DATE_FIELDS = ('last_login', 'date_joined', 'pub_date', 'updated', 'created')
+
+
+def open_dump(path, mode):
+    """Функция открытия файла выгрузки в текстовом режиме.
+    Файлы с расширением .gz сжимаются на лету"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def export_rows(label, chunk_size):
+    """Генератор строк модели в порядке первичного ключа.
+    Записи читаются порциями по ключу, поэтому память не растёт
+    с размером таблицы, а база не держит открытый курсор"""
+    model, fields = EXPORT_FIELDS[label]
+    queryset = model.objects.order_by('pk').values_list(
+        'pk', *fields.values()
+    )
+    last = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        last = chunk[-1][0]
+        for values in chunk:
+            yield dict(zip(fields, values[1:]))
+
+
+class DumpEncoder(DjangoJSONEncoder):
+    """Кодировщик, сохраняющий микросекунды в датах: от точного
+    времени публикации зависит порядок постов в лентах"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def dump_row(label, row):
+    return json.dumps(
+        {'model': label, **row}, cls=DumpEncoder, ensure_ascii=False
+    )
+
+
+def resolve(model, field, values):
+    """Функция пакетного поиска ключей по уникальному полю"""
+    values = {value for value in values if value is not None}
+    if not values:
+        return {}
+    return dict(model.objects.filter(
+        **{f'{field}__in': values}
+    ).values_list(field, 'pk'))
+
+
+def parse_dates(row):
+    for name in DATE_FIELDS:
+        if row.get(name):
+            row[name] = parse_datetime(row[name])
+    return row
+
+
+def build_users(rows):
+    return [User(**row) for row in rows], 0
+
+
+def build_groups(rows):
+    return [Group(**row) for row in rows], 0
+
+
+def build_posts(rows):
+    authors = resolve(User, 'username', [row['author'] for row in rows])
+    groups = resolve(Group, 'slug', [row['group'] for row in rows])
+    posts = []
+    for row in rows:
+        author_id = authors.get(row.pop('author'))
+        group = row.pop('group')
+        if author_id is None or group is not None and group not in groups:
+            continue
+        posts.append(Post(
+            author_id=author_id, group_id=groups.get(group), **row
+        ))
+    return posts, len(rows) - len(posts)
+
+
+def build_comments(rows):
+    authors = resolve(User, 'username', [row['author'] for row in rows])
+    post_ids = set(Post.objects.filter(
+        pk__in=[row['post'] for row in rows]
+    ).values_list('pk', flat=True))
+    comments = [
+        Comment(
+            post_id=row.pop('post'), author_id=authors[row.pop('author')],
+            **row
+        )
+        for row in rows
+        if row['post'] in post_ids and row['author'] in authors
+    ]
+    return comments, len(rows) - len(comments)
+
+
+def build_follows(rows):
+    users = resolve(
+        User, 'username',
+        [row['user'] for row in rows] + [row['author'] for row in rows]
+    )
+    follows = [
+        Follow(user_id=users[row['user']], author_id=users[row['author']])
+        for row in rows
+        if row['user'] in users and row['author'] in users
+        and row['user'] != row['author']
+    ]
+    return follows, len(rows) - len(follows)
+
+
+BUILDERS = {
+    'auth.user': build_users,
+    'posts.group': build_groups,
+    'posts.post': build_posts,
+    'posts.comment': build_comments,
+    'posts.follow': build_follows,
+}
+
+
+def import_chunk(label, rows):
+    """Функция загрузки порции строк одной модели одним bulk_create.
+    Внешние ключи ищутся одним запросом на порцию, строки со ссылками
+    на отсутствующие записи пропускаются. Уже загруженные записи
+    не дублируются, поэтому прерванную загрузку можно повторить.
+    Возвращает число загруженных и пропущенных строк"""
+    model = EXPORT_FIELDS[label][0]
+    rows = [parse_dates(row) for row in rows]
+    dates = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    with transaction.atomic(), explicit_dates(*dates):
+        objects, skipped = BUILDERS[label](rows)
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+    return len(objects), skipped
+
+
+def reset_sequences():
+    """Функция сдвига счётчиков первичных ключей после загрузки
+    постов и комментариев с явными ключами. SQLite это не нужно"""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Post, Comment]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,115 @@
+import hashlib
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+# Ограничение проверяется по заголовку файла, до распаковки пикселей
+MAX_IMAGE_PIXELS = 50 * 1000 * 1000
+# Большая сторона сохраняемого изображения
+MAX_IMAGE_SIDE = 2560
+# Форматы, которые принимаются и сохраняются в том же формате
+FORMATS = {
+    'JPEG': ('jpg', {'quality': 85, 'optimize': True}),
+    'PNG': ('png', {'optimize': True}),
+    'GIF': ('gif', {}),
+    'WEBP': ('webp', {'quality': 85}),
+}
+# Телефоны добавляют к JPEG блок MPF, и Pillow открывает такие
+# файлы как MPO. Сохраняется первый кадр как обычный JPEG
+SAVE_AS = {'MPO': 'JPEG'}
+# Метаданные, которые удаляются при перекодировании.
+# Прозрачность (transparency) остаётся: без неё пропадает альфа PNG и GIF
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'comments')
+
+
+class RejectedUpload(SimpleUploadedFile):
+    """Пустой файл на месте загрузки, отклонённой при приёме"""
+    def __init__(self, name, error):
+        super().__init__(name, b'')
+        self.error = error
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Обработчик загрузки, прекращающий сохранять файл больше
+    MAX_UPLOAD_SIZE. Должен стоять первым в FILE_UPLOAD_HANDLERS:
+    после превышения лимита следующие обработчики не получают данные,
+    а вместо файла в форму приходит RejectedUpload"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_UPLOAD_SIZE:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > MAX_UPLOAD_SIZE:
+            return RejectedUpload(
+                self.file_name,
+                f'Файл больше {MAX_UPLOAD_SIZE // 1024 // 1024} МБ'
+            )
+        return None
+
+
+def reencode_image(uploaded):
+    """Функция уменьшения изображения до MAX_IMAGE_SIDE и сохранения
+    без метаданных EXIF и XMP. Возвращает содержимое и расширение файла"""
+    uploaded.seek(0)
+    try:
+        return _reencode(uploaded)
+    except (OSError, Image.DecompressionBombError):
+        # Обрезанный файл проходит проверку ImageField,
+        # но не распаковывается
+        raise ValidationError('Файл повреждён или не является изображением')
+
+
+def _reencode(uploaded):
+    image = Image.open(uploaded)
+    pillow_format = SAVE_AS.get(image.format, image.format)
+    if pillow_format not in FORMATS:
+        raise ValidationError('Поддерживаются изображения JPEG, PNG, GIF '
+                              'и WebP')
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ValidationError(
+            f'Изображение больше {MAX_IMAGE_PIXELS // 1000000} мегапикселей'
+        )
+    extension, options = FORMATS[pillow_format]
+    if image.format == pillow_format and getattr(image, 'is_animated', False):
+        # Анимация при перекодировании теряется, поэтому сохраняется
+        # исходный файл: в GIF и анимированных WebP нет EXIF камеры
+        uploaded.seek(0)
+        return uploaded.read(), extension
+    # JPEG распаковывается сразу в уменьшенном в 2–8 раз виде
+    image.draft(None, (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), reducing_gap=3.0)
+    icc_profile = image.info.get('icc_profile')
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    if icc_profile:
+        options = dict(options, icc_profile=icc_profile)
+    output = BytesIO()
+    image.save(output, format=pillow_format, **options)
+    return output.getvalue(), extension
+
+
+def store_image(uploaded, field):
+    """Функция подготовки загруженного изображения к сохранению в поле.
+    Файл называется по хэшу содержимого, поэтому одинаковые загрузки
+    хранятся один раз: для уже сохранённого файла возвращается его имя"""
+    content, extension = reencode_image(uploaded)
+    content_hash = hashlib.sha256(content).hexdigest()
+    name = field.generate_filename(None, f'{content_hash}.{extension}')
+    if default_storage.exists(name):
+        return name
+    return ContentFile(content, name=f'{content_hash}.{extension}')
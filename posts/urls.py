@@ -8,6 +8,7 @@ urlpatterns = [
     path("group/<slug>/", views.group_posts, name="group_posts"),
     path("new/", views.post_new, name="post_new"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path(
@@ -1,41 +1,66 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
+from .caching import page_etag, page_signature, render_conditional
+from .counters import get_user_stats
+from .follows import follow_authors, unfollow_authors
 from .forms import PostForm, CommentForm
 from .models import Comment, Follow, Group, Post, User
+from .paginator import POSTS_PER_PAGE, CursorPaginator
+from .search import SearchResults
+from .tasks import enqueue
+from .timeline import timeline_entries
+
+
+def index_context(cursor=None):
+    """Функция построения контекста страницы главной ленты.
+    Её же использует задача прогрева кэша"""
+    post_list = Post.objects.select_related('author', 'group')
+    paginator = CursorPaginator(post_list, POSTS_PER_PAGE)
+    page = paginator.get_cursor_page(cursor)
+    return {
+        "page": page, "paginator": paginator,
+        "page_signature": page_signature(page)
+    }
 
 
 def index(request):
     """Функция вывода постов на главной странице"""
-    post_list = Post.objects.select_related(
-        'author', 'group'
-    ).prefetch_related(
-        'comments__author'
+    context = index_context(request.GET.get('cursor'))
+    page = context["page"]
+    etag = page_etag(
+        request, context["page_signature"], page.has_next(),
+        page.has_previous()
     )
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "index.html", {
-        "page": page, "paginator": paginator
-    },)
+    return render_conditional(request, "index.html", context, etag)
 
 
 def group_posts(request, slug):
     """Функция вывода постов на странице сообщества"""
-    group = get_object_or_404(
-        Group.objects.all(
-        ).prefetch_related(
-            'posts__author', 'posts__comments'
-        ),
-        slug=slug
+    group = get_object_or_404(Group, slug=slug)
+    posts = group.posts.select_related('author', 'group')
+    paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    etag = page_etag(
+        request, page_signature(page), page.has_next(), page.has_previous(),
+        group.title, group.description
     )
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "group.html", {
+    return render_conditional(request, "group.html", {
         "group": group, "page": page, "paginator": paginator
+    }, etag)
+
+
+def search(request):
+    """Функция поиска постов по тексту и комментариям.
+    Результаты упорядочены по релевантности, поэтому листаются по номерам"""
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, "search.html", {
+        "query": query, "page": page, "paginator": paginator
     },)
 
 
@@ -46,7 +71,13 @@ def post_new(request):
     if request.method == 'POST' and form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        # Пост и задачи по нему (включая раскладку по лентам из сигнала)
+        # фиксируются вместе: обработчик не увидит задачу без поста
+        with transaction.atomic():
+            new_post.save()
+            if new_post.image:
+                enqueue('generate_thumbnails', new_post.pk)
+            enqueue('warm_index_cache', unique=True)
         return redirect("index")
     return render(request, "post_new.html", {"form": form})
 
@@ -60,52 +91,55 @@ def is_subscribed(user, author):
 
 def profile(request, username):
     """Функция вывода постов на странице автора"""
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all().prefetch_related('comments__author', 'group')
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.select_related('author', 'group')
     following = is_subscribed(request.user, author)
 
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    try:
-        author_following_count = author.following.all().count()
-    except:
-        author_following_count = 0
-    try:
-        author_followers_count = author.followers.all().count()
-    except:
-        author_followers_count = 0
-    return render(request, 'profile.html', {
+    paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    stats = get_user_stats(author)
+    etag = page_etag(
+        request, page_signature(page), page.has_next(), page.has_previous(),
+        author.get_full_name(), following, stats.posts_count,
+        stats.followers_count, stats.following_count
+    )
+    return render_conditional(request, 'profile.html', {
         "page": page, "author": author,
         "paginator": paginator, "following": following,
-         "author_following_count": author_following_count,
-         "author_followers_count": author_followers_count
-        })
+        "stats": stats
+        }, etag)
 
 
 def post_view(request, username, post_id):
     """Функция вывода поста с комментариями к нему"""
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats'),
+        author__username=username, id=post_id
+    )
     author = post.author
-    post_count = author.posts.all().count()
     comments = Comment.objects.filter(
         post__id=post_id
     ).select_related('author')
     form = CommentForm(request.POST or None)
-    try:
-        author_following_count = author.following.all().count()
-    except:
-        author_following_count = 0
-    try:
-        author_followers_count = author.followers.all().count()
-    except:
-        author_followers_count = 0
-    return render(request, 'post.html', {
-            "post": post, "post_count": post_count, "author": author,
+    stats = get_user_stats(author)
+    # Форма комментария содержит CSRF-токен, поэтому после смены или
+    # потери cookie страница отрисовывается заново и cookie выставляется
+    csrf_cookie = ''
+    if request.user.is_authenticated:
+        csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    # Время изменения поста сдвигается и при добавлении комментариев
+    etag = page_etag(
+        request, post.pk, post.updated.timestamp(), author.get_full_name(),
+        stats.posts_count, stats.followers_count, stats.following_count,
+        csrf_cookie
+    )
+    return render_conditional(request, 'post.html', {
+            "post": post, "author": author,
             "comments": comments, "form": form,
-            "author_following_count": author_following_count,
-            "author_followers_count": author_followers_count
-        })
+            "stats": stats
+        }, etag)
 
 
 def post_edit(request, username, post_id):
@@ -116,7 +150,13 @@ def post_edit(request, username, post_id):
             request.POST or None, files=request.FILES or None, instance=post
         )
         if request.method == 'POST' and form.is_valid():
-            form.save()
+            image_changed = 'image' in form.changed_data
+            if image_changed:
+                post.image_hash = ''
+            with transaction.atomic():
+                post = form.save()
+                if image_changed and post.image:
+                    enqueue('generate_thumbnails', post.pk)
             return redirect("post", username=username, post_id=post_id)
         return render(request, "post_edit.html", {
             "form": form, "post": post
@@ -133,7 +173,8 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
         return redirect("post", username=username, post_id=post_id)
     return render(request, "comments.html", {"form": form, "post": post})
 
@@ -156,16 +197,11 @@ def server_error(request):
 @login_required
 def follow_index(request):
     """Функция вывода постов по подписке"""
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related(
-        'author', 'group'
-    ).prefetch_related(
-        'comments__author'
+    entries = timeline_entries(request.user).select_related(
+        'post__author', 'post__group'
     )
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator = CursorPaginator(entries, POSTS_PER_PAGE, item_attr='post')
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
     return render(request, "follow.html", {
         "page": page, "paginator": paginator
     },)
@@ -174,16 +210,12 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     """Функция создания подписки на выбранного автора"""
-    author = User.objects.get(username=username)
-    if (request.user != author and not is_subscribed(request.user, author)):
-        Follow.objects.create(user=request.user, author=author)
+    follow_authors(request.user.pk, [username])
     return redirect("profile", username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     """Функция удаления подписки на выбранного автора"""
-    Follow.objects.filter(
-        user=request.user, author__username=username
-        ).delete()
+    unfollow_authors(request.user.pk, [username])
     return redirect("profile", username=username)
@@ -0,0 +1,19 @@
+from contextlib import contextmanager
+
+import pytest
+
+
+@pytest.fixture
+def query_budget():
+    """Проверка бюджета SQL-запросов: with query_budget(5): client.get('/')
+    Тест падает со списком запросов, если бюджет превышен"""
+    from yatube.metrics import assert_query_budget
+
+    @contextmanager
+    def check(budget):
+        try:
+            with assert_query_budget(budget) as metrics:
+                yield metrics
+        except AssertionError as error:
+            pytest.fail(str(error), pytrace=False)
+    return check
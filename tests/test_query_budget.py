@@ -0,0 +1,36 @@
+import pytest
+from django.core.cache import cache
+
+from posts.models import Comment, Post
+
+
+# Бюджеты не зависят от числа постов на странице
+BUDGETS = {
+    'index': ('/', 3),
+    'group': ('/group/test-link/', 4),
+    'profile': ('/TestUser/', 5),
+}
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page', BUDGETS)
+    def test_feed_pages_within_budget(self, user_client, user, group,
+                                      query_budget, page):
+        for number in range(12):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=user, group=group
+            )
+            Comment.objects.create(post=post, author=user, text='Комментарий')
+        cache.clear()
+        url, budget = BUDGETS[page]
+        with query_budget(budget):
+            response = user_client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_budget_exceeded_fails(self, user_client, query_budget):
+        with pytest.raises(pytest.fail.Exception):
+            with query_budget(0):
+                user_client.get('/')
@@ -0,0 +1,24 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 itself is synchronous, so requests are handled by the WSGI
+application in a bounded thread pool while client I/O stays on the event loop.
+
+Run it with any ASGI server, for example::
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from yatube.handlers import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = ASGIHandler(
+    get_wsgi_application(), workers=settings.ASGI_THREADS
+)
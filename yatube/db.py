@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+def check_connections(**kwargs):
+    """Функция проверки постоянных соединений в начале запроса.
+    Соединение, оборванное сервером или пулом, закрывается,
+    и Django откроет новое вместо ошибки в запросе"""
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if connection.in_atomic_block:
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """Функция настройки нового соединения с SQLite по SQLITE_PRAGMAS"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, getattr(settings, 'SQLITE_PRAGMAS', {}))
+
+
+def connect_signals():
+    request_started.connect(
+        check_connections, dispatch_uid='yatube_check_connections'
+    )
+    connection_created.connect(
+        tune_sqlite, dispatch_uid='yatube_tune_sqlite'
+    )
@@ -0,0 +1,172 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+# Тело запроса больше этого размера складывается во временный файл
+MAX_BODY_IN_MEMORY = 2 * 1024 * 1024
+
+
+def build_environ(scope, body):
+    """Функция перевода ASGI-запроса в окружение WSGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь как байты, раскрытые в latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        if key in environ:
+            # Несколько заголовков cookie (их присылает HTTP/2)
+            # склеиваются через '; ', остальные через запятую
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = f'{environ[key]}{separator}{value}'
+        environ[key] = value
+    return environ
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх WSGI-приложения Django.
+
+    Чтение тела запроса и отправка ответа идут в цикле событий, а сам
+    Django выполняется в пуле из workers потоков. Медленные клиенты
+    не занимают потоки, а число одновременных обращений к базе
+    ограничено размером пула.
+    """
+
+    def __init__(self, wsgi_application, workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(
+                f'Неподдерживаемый тип соединения: {scope["type"]}'
+            )
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, content = await loop.run_in_executor(
+                self.executor, self.run_wsgi, build_environ(scope, body)
+            )
+        finally:
+            body.close()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        if isinstance(content, bytes):
+            await send({'type': 'http.response.body', 'body': content})
+        else:
+            await self.stream(loop, content, send)
+
+    async def stream(self, loop, response, send):
+        """Отправляет потоковый ответ по частям.
+        Каждая часть читается в пуле, поэтому файл не загружается
+        в память целиком, а поток не ждёт медленного клиента"""
+        chunks = iter(response)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(
+                    self.executor, next, chunks, None
+                )
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(response, 'close'):
+                await loop.run_in_executor(self.executor, response.close)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Читает тело запроса целиком.
+        Возвращает None, если клиент отключился раньше"""
+        body = SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+        return body
+
+    def run_wsgi(self, environ):
+        """Выполняет WSGI-приложение в потоке пула.
+        Обычный ответ собирается целиком, чтобы поток освободился
+        до отправки данных клиенту. Потоковый ответ (файлы, диапазоны
+        из serve_media) возвращается как есть и отправляется в stream"""
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            response_start['status'] = int(status.split(' ', 1)[0])
+            response_start['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        if getattr(response, 'streaming', False):
+            return (
+                response_start['status'], response_start['headers'],
+                response
+            )
+        content = BytesIO()
+        try:
+            for chunk in response:
+                content.write(chunk)
+        finally:
+            # close() отправляет request_finished, который
+            # возвращает соединение с базой
+            if hasattr(response, 'close'):
+                response.close()
+        return (
+            response_start['status'], response_start['headers'],
+            content.getvalue()
+        )
@@ -0,0 +1,119 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+# Миниатюры названы по хэшу содержимого и никогда не меняются
+IMMUTABLE_PREFIXES = ('thumbs/',)
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MEDIA_MAX_AGE = 60 * 60 * 24
+
+# Старые версии Python не знают типы современных форматов миниатюр
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+
+def parse_range(header, size):
+    """Функция разбора заголовка Range с одним диапазоном.
+    Возвращает (начало, конец) включительно, None для заголовка,
+    который нужно проигнорировать, и False для недостижимого диапазона"""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Суффикс: последние end байт файла
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(file, start, length):
+    file.seek(start)
+    try:
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_response(request, full_path, size):
+    """Функция ответа целым файлом или запрошенным диапазоном"""
+    byte_range = None
+    if request.method == 'GET' and 'HTTP_RANGE' in request.META:
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(open(full_path, 'rb'))
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(open(full_path, 'rb'), start, end - start + 1),
+            status=206
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path):
+    """Функция отдачи загруженных файлов.
+
+    Если задан MEDIA_ACCEL_REDIRECT, файл отдаёт nginx по внутреннему
+    адресу через X-Accel-Redirect вместе с поддержкой Range. Иначе
+    файл отдаётся через FileResponse, который сервер может передать
+    через sendfile, а запросы Range обрабатываются здесь.
+    """
+    # Путь за пределами MEDIA_ROOT вызывает SuspiciousFileOperation (400)
+    full_path = safe_join(settings.MEDIA_ROOT, path)
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime,
+        stat.st_size
+    ):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT.rstrip('/') + '/' + quote(path)
+        )
+    else:
+        response = file_response(request, full_path, stat.st_size)
+        response['Content-Type'] = content_type
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    immutable = path.startswith(IMMUTABLE_PREFIXES)
+    patch_cache_control(
+        response, public=True,
+        max_age=IMMUTABLE_MAX_AGE if immutable else MEDIA_MAX_AGE
+    )
+    if immutable:
+        patch_cache_control(response, immutable=True)
+    return response
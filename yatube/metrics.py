@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+
+logger = logging.getLogger(__name__)
+
+# Замеры, открытые в текущем потоке: запрос и вложенные проверки в тестах
+_active = ContextVar('yatube_metrics', default=())
+
+
+class RequestMetrics:
+    """Число запросов к базе, их суммарное время и время отрисовки шаблонов"""
+
+    def __init__(self, keep_statements=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = [] if keep_statements else None
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения SQL, учитывающая запрос во всех открытых замерах"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for metrics in _active.get():
+            metrics.queries += 1
+            metrics.db_time += elapsed
+            if metrics.statements is not None:
+                metrics.statements.append(sql)
+
+
+@contextmanager
+def collect_metrics(keep_statements=False):
+    """Контекстный менеджер замера запросов и шаблонов в текущем потоке.
+    В отличие от панели отладки работает и без DEBUG"""
+    metrics = RequestMetrics(keep_statements)
+    outer = _active.get()
+    token = _active.set(outer + (metrics,))
+    try:
+        with ExitStack() as stack:
+            # Обёртки ставит только внешний замер, вложенные их используют
+            if not outer:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(record_query)
+                    )
+            yield metrics
+    finally:
+        _active.reset(token)
+
+
+class TimedTemplate:
+    """Шаблон, учитывающий время своей отрисовки в открытых замерах"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            elapsed = time.perf_counter() - started
+            for metrics in _active.get():
+                metrics.template_time += elapsed
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django с замером времени отрисовки страниц.
+    Вложенные шаблоны (include, extends) входят во время страницы"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class ViewMetrics:
+    """Накопленные в процессе показатели по именам представлений"""
+
+    FIELDS = ('requests', 'queries', 'max_queries', 'db_time',
+              'template_time', 'total_time')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, view, metrics, total_time):
+        with self.lock:
+            stats = self.views.setdefault(
+                view, dict.fromkeys(self.FIELDS, 0)
+            )
+            stats['requests'] += 1
+            stats['queries'] += metrics.queries
+            stats['max_queries'] = max(stats['max_queries'], metrics.queries)
+            stats['db_time'] += metrics.db_time
+            stats['template_time'] += metrics.template_time
+            stats['total_time'] += total_time
+
+    def snapshot(self):
+        with self.lock:
+            return {view: dict(stats) for view, stats in self.views.items()}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+VIEW_METRICS = ViewMetrics()
+
+# Показатель ViewMetrics, имя метрики Prometheus и её тип
+PROMETHEUS_METRICS = (
+    ('requests', 'yatube_view_requests_total', 'counter'),
+    ('queries', 'yatube_view_queries_total', 'counter'),
+    ('max_queries', 'yatube_view_queries_max', 'gauge'),
+    ('db_time', 'yatube_view_db_seconds_total', 'counter'),
+    ('template_time', 'yatube_view_template_seconds_total', 'counter'),
+    ('total_time', 'yatube_view_seconds_total', 'counter'),
+)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def server_timing(metrics, total_time):
+    """Функция построения заголовка Server-Timing, длительности в мс"""
+    return ', '.join((
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} SQL"',
+        f'tpl;dur={metrics.template_time * 1000:.1f}',
+        f'total;dur={total_time * 1000:.1f}',
+    ))
+
+
+class RequestMetricsMiddleware:
+    """Замер запросов к базе и отрисовки шаблонов для каждого запроса.
+    Итог отдаётся сотрудникам в заголовке Server-Timing и копится
+    в VIEW_METRICS,
+    а превышение QUERY_BUDGET записывается в журнал"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+        total_time = time.perf_counter() - started
+        view = view_name(request)
+        VIEW_METRICS.add(view, metrics, total_time)
+        if metrics.queries > settings.QUERY_BUDGET:
+            logger.warning(
+                'Представление %s выполнило %d SQL-запросов при бюджете %d',
+                view, metrics.queries, settings.QUERY_BUDGET
+            )
+        # Время базы и число запросов выдают устройство сайта, поэтому
+        # без SERVER_TIMING заголовок получают только сотрудники
+        user = getattr(request, 'user', None)
+        if settings.SERVER_TIMING or (user is not None and user.is_staff):
+            response['Server-Timing'] = server_timing(metrics, total_time)
+        return response
+
+
+@contextmanager
+def assert_query_budget(budget):
+    """Проверка, что код внутри блока выполнил не больше budget
+    SQL-запросов. При превышении выводятся сами запросы"""
+    with collect_metrics(keep_statements=True) as metrics:
+        yield metrics
+    if metrics.queries > budget:
+        statements = '\n'.join(
+            f'{number}. {sql}'
+            for number, sql in enumerate(metrics.statements, 1)
+        )
+        raise AssertionError(
+            f'Выполнено {metrics.queries} SQL-запросов '
+            f'при бюджете {budget}:\n{statements}'
+        )
+
+
+def metrics_view(request):
+    """Функция вывода накопленных показателей в формате Prometheus.
+    Доступна сотрудникам и по токену METRICS_TOKEN"""
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not (request.user.is_staff or token and constant_time_compare(
+        authorization, f'Bearer {token}'
+    )):
+        raise Http404
+    views = sorted(VIEW_METRICS.snapshot().items())
+    lines = []
+    for field, name, kind in PROMETHEUS_METRICS:
+        lines.append(f'# TYPE {name} {kind}')
+        for view, stats in views:
+            lines.append(f'{name}{{view="{view}"}} {stats[field]}')
+    return HttpResponse(
+        '\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4'
+    )
@@ -1,14 +1,28 @@
+import hashlib
 import os
+import sys
+import tempfile
 
 from dotenv import load_dotenv
+import environ
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
 
 
 load_dotenv()
+env = environ.Env()
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Запуск тестов через manage.py test или pytest
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+# Файлы тестов во временной папке называются по хэшу пути к проекту,
+# чтобы прогоны из разных копий на одной машине не мешали друг другу
+TEST_FILES_PREFIX = os.path.join(
+    tempfile.gettempdir(),
+    'yatube-test-' + hashlib.md5(BASE_DIR.encode()).hexdigest()[:12]
+)
+
 # sentry_sdk.init(
 #     dsn="https://fe0e644175dd406cb247c7ee822a47b1@o911494.ingest.sentry.io/5847702", 
 #     integrations=[DjangoIntegration()],
@@ -35,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы в замер попало время всех остальных слоёв
+    'yatube.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -48,12 +64,21 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Запрос, выполнивший больше SQL-запросов, записывается в журнал
+QUERY_BUDGET = env.int('QUERY_BUDGET', default=30)
+# Заголовок Server-Timing с временем базы и шаблонов во всех ответах.
+# По умолчанию его получают только сотрудники (is_staff)
+SERVER_TIMING = env.bool('SERVER_TIMING', default=False)
+# Токен для сбора метрик по адресу /metrics/ без входа на сайт
+METRICS_TOKEN = env.str('METRICS_TOKEN', default='')
+
 TEMPLATES_DIR_1 = (os.path.join(BASE_DIR, "templates"))
 TEMPLATES_DIR_2 = (os.path.join(BASE_DIR, "templates/include"))
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR_1, TEMPLATES_DIR_2],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -62,18 +87,64 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.feed_cache',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Размер пула потоков, в котором ASGI-приложение выполняет Django.
+# Ограничивает и число одновременных соединений с базой
+ASGI_THREADS = env.int('ASGI_THREADS', default=8)
 
+# В продакшене база задаётся через DATABASE_URL (postgres://...),
+# для разработки остаётся SQLite
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    'default': env.db(
+        'DATABASE_URL',
+        default='sqlite:///' + os.path.join(BASE_DIR, 'db.sqlite3')
+    ),
+}
+# Постоянные соединения: сколько секунд держать соединение между запросами
+DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=0)
+# Проверка постоянного соединения перед запросом (см. yatube/db.py)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = env.bool(
+    'DB_CONN_HEALTH_CHECKS', default=True
+)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Сколько секунд писатель ждёт освобождения блокировки
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': env.int('SQLITE_TIMEOUT', default=20),
+    }
+    # Тестовая база SQLite хранится в файле во временной папке: база
+    # в памяти не ждёт блокировок, и тесты одновременной записи
+    # из нескольких потоков на ней не работают
+    DATABASES['default']['TEST'] = {
+        'NAME': env(
+            'SQLITE_TEST_NAME', default=TEST_FILES_PREFIX + '.sqlite3'
+        ),
     }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': env.int('DB_CONNECT_TIMEOUT', default=5),
+    }
+    # За пулом соединений (PgBouncer в режиме transaction)
+    # серверные курсоры не работают
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = env.bool(
+        'DB_POOLED', default=False
+    )
+
+# PRAGMA для каждого нового соединения с SQLite (см. yatube/db.py).
+# WAL позволяет читать базу во время записи комментариев и постов
+SQLITE_PRAGMAS = {
+    'journal_mode': env('SQLITE_JOURNAL_MODE', default='wal'),
+    'synchronous': env('SQLITE_SYNCHRONOUS', default='normal'),
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024),
+    # Отрицательное значение задаёт размер кэша в килобайтах
+    'cache_size': env.int('SQLITE_CACHE_SIZE', default=-64 * 1024),
+    'temp_store': 'memory',
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -103,9 +174,23 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Имена собранных файлов содержат хэш, рядом лежат копии в gzip
+# и brotli (если установлен пакет Brotli)
+STATICFILES_STORAGE = 'yatube.storage.StaticStorage'
+
+# Первый обработчик прекращает приём слишком больших файлов,
+# ограничения заданы в posts/uploads.py
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Внутренний адрес nginx (location с internal), через который отдаются
+# загруженные файлы. Если не задан, файлы отдаёт Django
+MEDIA_ACCEL_REDIRECT = env.str('MEDIA_ACCEL_REDIRECT', default='')
 
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
@@ -114,10 +199,23 @@ LOGOUT_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Кэш общий для всех процессов gunicorn: в продакшене задаётся
+# CACHE_URL (redis://, memcache://), локально используется файловый кэш
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': env.cache(
+        'CACHE_URL',
+        default='filecache://' + os.path.join(BASE_DIR, 'cache')
+    ),
 }
+if TESTING:
+    # Тесты очищают кэш, поэтому у них свой каталог во временной папке,
+    # а не кэш разработчика или продакшена (задаётся TEST_CACHE_URL)
+    CACHES = {
+        'default': env.cache(
+            'TEST_CACHE_URL',
+            default='filecache://' + TEST_FILES_PREFIX + '-cache'
+        ),
+    }
+CACHES['default']['KEY_PREFIX'] = env('CACHE_KEY_PREFIX', default='yatube')
 
 INTERNAL_IPS = ['127.0.0.1']
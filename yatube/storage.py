@@ -0,0 +1,17 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticStorage(CompressedManifestStaticFilesStorage):
+    """Хранилище статики с хэшами в именах файлов и сжатыми копиями.
+
+    Файлы с хэшем в имени WhiteNoise отдаёт с Cache-Control immutable.
+    Пока collectstatic не запускался (разработка и тесты), ссылки
+    на отсутствующие файлы строятся без хэша вместо ошибки.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
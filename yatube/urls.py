@@ -4,18 +4,22 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
-from django.views.static import serve 
+
+from yatube.media import serve_media
+from yatube.metrics import metrics_view
 
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
+    path("metrics/", metrics_view, name="metrics"),
+    path("api/v1/", include("posts.api_urls")),
     path("", include("posts.urls")),
     path("about/", include("about.urls", namespace="about")),
     path("404/", handler404),
     path("500/", handler500),
-    re_path(r'^media/(?P<path>.*)$', serve,{'document_root': settings.MEDIA_ROOT}),
-    re_path(r'^static/(?P<path>.*)$', serve,{'document_root': settings.STATIC_ROOT}),
+    # Статику отдаёт WhiteNoiseMiddleware
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 ]
 
 handler404 = "posts.views.page_not_found"
@@ -24,7 +28,6 @@ handler500 = "posts.views.server_error"
 if settings.DEBUG:
     import debug_toolbar
     
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)
     urlpatterns += staticfiles_urlpatterns()